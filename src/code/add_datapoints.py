@@ -1,10 +1,36 @@
 import json
 import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
 
 from dotenv import load_dotenv
 from google.cloud import aiplatform
 from google.oauth2 import service_account
-from langchain_google_vertexai import VectorSearchVectorStore, VertexAIEmbeddings
+
+# Add the src directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.code import doc_store
+from src.code.bm25_index import BM25Index
+from src.code.columnar_dataset import build_partition, current_dataset, list_buckets
+from src.code.embedders import get_active_index, get_vector_store
+from src.code.ingest_plan import (
+    build_manifest,
+    datapoint_id,
+    delete_manifest,
+    get_ingest_state,
+    init_manifest,
+    load_manifest,
+    plan_diff,
+    read_manifest,
+    replace_manifest,
+    set_ingest_state,
+    upsert_manifest,
+)
+from src.code.normalization import count_tokens, normalize_profile
+from src.code.serialization import serialize_document
 
 load_dotenv()
 
@@ -14,32 +40,152 @@ REGION = os.environ["GCS_REGION"]
 BUCKET = os.environ["GCS_BUCKET"]
 BUCKET_URI = f"gs://{BUCKET}"
 CREDENTIALS = os.environ["GCS_CREDENTIAL_FILE"]
-INDEX_ID = os.environ["INDEX_ID"]
-INDEX_ENDPOINT_ID = os.environ["INDEX_ENDPOINT_ID"]
 
-# The number of dimensions for the textembedding-gecko@003 is 768
-# If other embedder is used, the dimensions would probably need to change.
-DIMENSIONS = os.environ["DIMENSIONS"]
+# Used until an index is registered by create_vector_index.py
+INDEX_ID = os.environ.get("INDEX_ID")
+INDEX_ENDPOINT_ID = os.environ.get("INDEX_ENDPOINT_ID")
 
 # Index Constants
 DISPLAY_NAME = os.environ["DISPLAY_NAME"]
 DEPLOYED_INDEX_ID = os.environ["DEPLOYED_INDEX_ID"]
 
+# Local lexical index used by the hybrid search mode
+BM25_INDEX_PATH = os.environ.get("BM25_INDEX_PATH", "data/bm25_index.pkl")
+
+# Manifest of the last ingested dataset, used to compute the upserts and removals.
+# It is kept in the doc store database, MANIFEST_PATH is the JSON manifest of
+# earlier versions, imported once.
+MANIFEST_PATH = os.environ.get("MANIFEST_PATH", "data/manifest.json")
+UPSERT_BATCH_SIZE = int(os.environ.get("UPSERT_BATCH_SIZE", 100))
+
+# Local profile store used to enrich search results
+DOC_STORE_PATH = os.environ.get("DOC_STORE_PATH", "data/profiles.sqlite")
+
+# INGEST_SOURCE is either "json" (data.json) or "parquet", which reads the
+# partitioned dataset written by user_data_retrieval_script.py.
+INGEST_SOURCE = os.environ.get("INGEST_SOURCE", "json")
+DATA_PATH = os.environ.get(
+    "DATA_PATH", r"D:\Workspace\vector-search\src\data\data.json"
+)
+DATASET_PATH = os.environ.get("DATASET_PATH", "data/dataset")
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", os.cpu_count()))
+
+# Token counts of every profile before and after normalization
+NORMALIZATION_REPORT_PATH = os.environ.get(
+    "NORMALIZATION_REPORT_PATH", "data/normalization_report.jsonl"
+)
+
+
+def chunking(data, size):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+def apply_diff(
+    vector_store,
+    bm25_index,
+    conn,
+    manifest,
+    current,
+    texts,
+    profiles,
+    upserts,
+    removals,
+):
+    # Datapoints are upserted and removed in place through the streaming update
+    # API, so the deployed index always holds either the old or the new version
+    # of a profile and is never rebuilt from scratch. The doc store and the
+    # manifest only rewrite the rows of the batch.
+    for batch in chunking(upserts, UPSERT_BATCH_SIZE):
+        vector_store.add_texts(
+            texts=[texts[key] for key in batch],
+            ids=batch,
+            is_complete_overwrite=False,
+        )
+        doc_store.upsert_profiles(conn, [profiles[key] for key in batch])
+        upsert_manifest(conn, {key: current[key] for key in batch})
+        for key in batch:
+            manifest[key] = current[key]
+            bm25_index.add(current[key]["user_id"], texts[key])
+
+    for batch in chunking(removals, UPSERT_BATCH_SIZE):
+        vector_store.delete(ids=batch)
+        doc_store.delete_profiles(conn, [manifest[key]["user_id"] for key in batch])
+        delete_manifest(conn, batch)
+        for key in batch:
+            bm25_index.remove(manifest.pop(key)["user_id"])
+
+
+def overwrite_index(index, conn, current, texts, profiles):
+    # Indexes ingested before ingest was diff based hold datapoints with random
+    # ids. The first run without a manifest replaces the whole index contents in
+    # one batch update with the deterministic ids, later runs only apply diffs.
+    vector_store = get_vector_store(
+        index, PROJECT_ID, REGION, BUCKET, stream_update=False
+    )
+    keys = list(current)
+    vector_store.add_texts(
+        texts=[texts[key] for key in keys], ids=keys, is_complete_overwrite=True
+    )
+    doc_store.sync_profiles(conn, [profiles[key] for key in keys])
+    bm25_index = BM25Index()
+    for key in keys:
+        bm25_index.add(current[key]["user_id"], texts[key])
+    bm25_index.save(BM25_INDEX_PATH)
+    replace_manifest(conn, current)
+    set_ingest_state(conn, "bm25_synced", "1")
+
+
+def write_normalization_report(file, user_ids, tokens_before, tokens_after):
+    for user_id, before, after in zip(user_ids, tokens_before, tokens_after):
+        file.write(
+            json.dumps(
+                {"user_id": user_id, "tokens_before": before, "tokens_after": after}
+            )
+            + "\n"
+        )
+
+
+def read_json_partition():
+    with open(DATA_PATH, "r") as file:
+        raw_data = json.load(file)
+    user_ids = [data["user_id"] for data in raw_data]
+    tokens_before = [count_tokens(serialize_document(data)) for data in raw_data]
+    data_dict = [normalize_profile(data) for data in raw_data]
+    serialized_data = [serialize_document(data) for data in data_dict]
+    tokens_after = [count_tokens(text) for text in serialized_data]
+    return user_ids, serialized_data, data_dict, tokens_before, tokens_after
+
+
+def iter_partitions():
+    # Profiles are normalized before they are serialized, so the vectors, the
+    # lexical index and the doc store all see the same deduplicated records.
+    # Each partition is (user_ids, texts, profiles, tokens_before, tokens_after).
+    if INGEST_SOURCE != "parquet":
+        # data.json is a single partition
+        yield read_json_partition()
+        return
 
-def flatten_json(data, parent_key="", sep="_"):
-    items = []
-    for k, v in data.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            items.extend(flatten_json(v, new_key, sep=sep).items())
-        elif isinstance(v, list):
-            for i, item in enumerate(v):
-                items.extend(
-                    flatten_json({f"{new_key}{sep}{i}": item}, "", sep=sep).items()
-                )
-        else:
-            items.append((new_key, v))
-    return dict(items)
+    # Workers read and serialize the next buckets while the current one is
+    # ingested. At most INGEST_WORKERS + 1 partitions are held in memory.
+    dataset = current_dataset(DATASET_PATH)
+    with ProcessPoolExecutor(INGEST_WORKERS) as executor:
+        pending = deque()
+        for bucket in list_buckets(dataset):
+            pending.append(executor.submit(build_partition, dataset, bucket))
+            if len(pending) > INGEST_WORKERS:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def load_documents():
+    user_ids, serialized_data, data_dict = [], [], []
+    for partition in iter_partitions():
+        user_ids.extend(partition[0])
+        serialized_data.extend(partition[1])
+        data_dict.extend(partition[2])
+    return user_ids, serialized_data, data_dict
 
 
 def main():
@@ -56,32 +202,91 @@ def main():
         staging_bucket=BUCKET_URI,
         credentials=my_credentials,
     )
-    my_index = aiplatform.MatchingEngineIndex(INDEX_ID)
-    my_index_endpoint = aiplatform.MatchingEngineIndexEndpoint(INDEX_ENDPOINT_ID)
-    embedding_model = VertexAIEmbeddings(model_name="textembedding-gecko@003")
-
-    # Create a Vector Store
-    vector_store = VectorSearchVectorStore.from_components(
-        project_id=PROJECT_ID,
-        region=REGION,
-        gcs_bucket_name=BUCKET,
-        index_id=my_index.name,
-        endpoint_id=my_index_endpoint.name,
-        embedding=embedding_model,
-        stream_update=True,
-    )
+    # Queries and documents are embedded with the model of the active index
+    index = get_active_index(INDEX_ID, INDEX_ENDPOINT_ID)
+
+    vector_store = get_vector_store(index, PROJECT_ID, REGION, BUCKET)
+
+    current, texts, profiles = {}, {}, {}
+    seen = set()
+    tokens = [0, 0]
+    with closing(doc_store.connect(DOC_STORE_PATH)) as conn, open(
+        NORMALIZATION_REPORT_PATH, "w"
+    ) as report:
+        # NOTE : The one-time overwrite of an index without a manifest needs
+        # every datapoint in a single batch update, so only that run holds the
+        # whole dataset in memory. Otherwise every partition is diffed and
+        # ingested on its own, and the manifest rows of every batch are saved
+        # once acknowledged, so an interrupted run only re-applies the batches
+        # that were not acknowledged yet.
+        init_manifest(conn)
+        manifest = read_manifest(conn)
+        if not manifest and os.path.exists(MANIFEST_PATH):
+            manifest = load_manifest(MANIFEST_PATH)
+            replace_manifest(conn, manifest)
+            set_ingest_state(conn, "bm25_synced", "1")
+        overwrite = not manifest
+
+        # The lexical index is kept in sync with the exact same text as the
+        # vectors. It is only saved at the end of a run, an interrupted run left
+        # it behind the manifest and it is rebuilt from every partition.
+        rebuild_bm25 = (
+            overwrite
+            or not os.path.exists(BM25_INDEX_PATH)
+            or get_ingest_state(conn, "bm25_synced") != "1"
+        )
+        bm25_index = BM25Index() if rebuild_bm25 else BM25Index.load(BM25_INDEX_PATH)
+        if not overwrite:
+            set_ingest_state(conn, "bm25_synced", "0")
+
+        for user_ids, serialized_data, data_dict, before, after in iter_partitions():
+            write_normalization_report(report, user_ids, before, after)
+            tokens[0] += sum(before)
+            tokens[1] += sum(after)
+            partition = build_manifest(user_ids, serialized_data)
+            partition_texts = {
+                datapoint_id(user_id): text
+                for user_id, text in zip(user_ids, serialized_data)
+            }
+            partition_profiles = {
+                datapoint_id(data["user_id"]): data for data in data_dict
+            }
+            if overwrite:
+                current.update(partition)
+                texts.update(partition_texts)
+                profiles.update(partition_profiles)
+                continue
 
-    with open(r"D:\Workspace\vector-search\src\data\data.json", "r") as file:
-        data_dict = json.load(file)
+            seen.update(partition)
+            upserts, _ = plan_diff(manifest, partition)
+            print(f"{len(upserts)} upserts in a partition of {len(partition)}")
+            if rebuild_bm25:
+                for key in partition.keys() - set(upserts):
+                    bm25_index.add(partition[key]["user_id"], partition_texts[key])
+            apply_diff(
+                vector_store,
+                bm25_index,
+                conn,
+                manifest,
+                partition,
+                partition_texts,
+                partition_profiles,
+                upserts,
+                [],
+            )
+        print(f"{tokens[0]} tokens before, {tokens[1]} after normalization")
 
-    flattened_data = [flatten_json(data) for data in data_dict]
-    serialized_data = [
-        (" ".join(f"{key}: {value}" for key, value in data.items()))
-        for data in flattened_data
-    ]
+        if overwrite:
+            print(f"No manifest, overwriting the index with {len(current)} datapoints")
+            overwrite_index(index, conn, current, texts, profiles)
+            return
 
-    # Add vectors and mapped text chunks to your vector store
-    vector_store.add_texts(texts=serialized_data, is_complete_overwrite=True)
+        # Datapoints of users that are in none of the partitions anymore
+        removals = [key for key in manifest if key not in seen]
+        print(f"{len(removals)} removals")
+        apply_diff(vector_store, bm25_index, conn, manifest, {}, {}, {}, [], removals)
+        bm25_index.save(BM25_INDEX_PATH)
+        set_ingest_state(conn, "bm25_synced", "1")
 
 
 if __name__ == "__main__":
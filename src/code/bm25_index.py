@@ -0,0 +1,134 @@
+import math
+import os
+import pickle
+import re
+from array import array
+from collections import Counter
+
+import numpy as np
+
+# Keeps dotted tokens such as "b.ed" or "m.sc" together so that hard keywords in
+# job posts can be matched exactly.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)*")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    def __init__(self, k1=1.2, b=0.75, compaction_ratio=0.2):
+        self.k1 = k1
+        self.b = b
+        self.compaction_ratio = compaction_ratio
+        self.doc_keys = []
+        self.doc_numbers = {}
+        self.doc_lengths = array("I")
+        self.alive = array("B")
+        # term -> (doc numbers, term frequencies), both append-only arrays.
+        self.postings = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_numbers)
+
+    def __contains__(self, key):
+        return key in self.doc_numbers
+
+    def add(self, key, text):
+        if key in self.doc_numbers:
+            self.remove(key)
+        tokens = tokenize(text)
+        number = len(self.doc_keys)
+        self.doc_keys.append(key)
+        self.doc_numbers[key] = number
+        self.doc_lengths.append(len(tokens))
+        self.alive.append(1)
+        self.total_length += len(tokens)
+        for term, frequency in Counter(tokens).items():
+            docs, frequencies = self.postings.setdefault(term, (array("I"), array("I")))
+            docs.append(number)
+            frequencies.append(frequency)
+
+    def remove(self, key):
+        number = self.doc_numbers.pop(key, None)
+        if number is None:
+            return
+        # Removed documents are tombstoned and dropped from the postings on the
+        # next compaction.
+        self.alive[number] = 0
+        self.total_length -= self.doc_lengths[number]
+        dead = len(self.doc_keys) - len(self.doc_numbers)
+        if dead > self.compaction_ratio * len(self.doc_keys):
+            self.compact()
+
+    def compact(self):
+        renumbered = array("i", [-1]) * len(self.doc_keys)
+        doc_keys = []
+        doc_lengths = array("I")
+        for number, key in enumerate(self.doc_keys):
+            if self.alive[number]:
+                renumbered[number] = len(doc_keys)
+                doc_keys.append(key)
+                doc_lengths.append(self.doc_lengths[number])
+
+        postings = {}
+        for term, (docs, frequencies) in self.postings.items():
+            new_docs, new_frequencies = array("I"), array("I")
+            for number, frequency in zip(docs, frequencies):
+                if renumbered[number] >= 0:
+                    new_docs.append(renumbered[number])
+                    new_frequencies.append(frequency)
+            if new_docs:
+                postings[term] = (new_docs, new_frequencies)
+
+        self.doc_keys = doc_keys
+        self.doc_numbers = {key: number for number, key in enumerate(doc_keys)}
+        self.doc_lengths = doc_lengths
+        self.alive = array("B", [1]) * len(doc_keys)
+        self.postings = postings
+
+    def search(self, query, k=10):
+        # Without any tokens in the live documents no term can match
+        if not self.doc_numbers or not self.total_length:
+            return []
+        doc_count = len(self.doc_numbers)
+        alive = np.frombuffer(self.alive, dtype=np.uint8)
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32).astype(np.float32)
+        norms = self.k1 * (
+            1 - self.b + self.b * lengths / (self.total_length / doc_count)
+        )
+        scores = np.zeros(len(self.doc_keys), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            docs, frequencies = self.postings[term]
+            docs = np.frombuffer(docs, dtype=np.uint32)
+            frequencies = np.frombuffer(frequencies, dtype=np.uint32).astype(np.float32)
+            # Postings still hold tombstoned documents until the next compaction,
+            # only the live ones count towards the document frequency.
+            matches = int(np.count_nonzero(alive[docs]))
+            if not matches:
+                continue
+            idf = math.log(1 + (doc_count - matches + 0.5) / (matches + 0.5))
+            scores[docs] += (
+                idf * frequencies * (self.k1 + 1) / (frequencies + norms[docs])
+            )
+        scores *= alive
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if not k:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.doc_keys[number], float(scores[number])) for number in top]
+
+    def save(self, path):
+        with open(f"{path}.tmp", "wb") as file:
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return pickle.load(file)
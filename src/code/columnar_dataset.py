@@ -0,0 +1,235 @@
+import os
+import shutil
+import time
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.code.normalization import (
+    LIST_FIELDS,
+    TOKEN_PATTERN,
+    count_tokens,
+    normalize_frame,
+)
+
+# Profile sections in the order they appear in the serialized documents
+SECTIONS = [
+    "preferred_work_locations",
+    "user_awards",
+    "user_certifications",
+    "user_computed_fields",
+    "user_interests",
+    "user_languages",
+    "user_profiles",
+    "user_projects",
+    "user_publications",
+    "user_qualifications",
+    "user_skills",
+    "user_subject_experiences",
+    "user_subject_interests",
+    "user_test_scores",
+    "user_work_experiences",
+]
+
+# Number of consecutive user ids stored in one partition
+BUCKET_SIZE = int(os.environ.get("DATASET_BUCKET_SIZE", 100000))
+
+
+def write_section(df, root, section, bucket_size=BUCKET_SIZE):
+    if df.empty:
+        return
+    # Values are stored as strings so that every chunk of a section has the same
+    # schema and serializes exactly like the values of data.json.
+    df = df.astype({column: str for column in df.columns if column != "user_id"})
+    df["bucket"] = df["user_id"] // bucket_size
+    df.to_parquet(os.path.join(root, section), partition_cols=["bucket"], index=False)
+
+
+def staging_path(root):
+    # Every extraction writes into a new version of the dataset, since to_parquet
+    # adds new files to a partition instead of replacing it. The version is only
+    # visible to readers once it is published.
+    path = os.path.join(root, "versions", str(time.time_ns()))
+    os.makedirs(path)
+    return path
+
+
+def compact_dataset(path):
+    # Every extraction chunk adds one file to each bucket it touches, so the
+    # files of a bucket are merged into a single one before publishing.
+    for section in os.listdir(path):
+        for bucket in os.listdir(os.path.join(path, section)):
+            bucket_path = os.path.join(path, section, bucket)
+            files = os.listdir(bucket_path)
+            if len(files) < 2:
+                continue
+            table = ds.dataset(bucket_path, format="parquet").to_table()
+            pq.write_table(table, os.path.join(bucket_path, "part.parquet.tmp"))
+            for name in files:
+                os.remove(os.path.join(bucket_path, name))
+            os.rename(
+                os.path.join(bucket_path, "part.parquet.tmp"),
+                os.path.join(bucket_path, "part.parquet"),
+            )
+
+
+def current_dataset(root):
+    # Readers resolve the published version once and keep reading it even when
+    # a newer version is published in the meantime.
+    pointer = os.path.join(root, "CURRENT")
+    if not os.path.exists(pointer):
+        # Dataset written before versions were introduced
+        return root
+    with open(pointer, "r") as file:
+        return os.path.join(root, "versions", file.read().strip())
+
+
+def publish_dataset(version, root):
+    # The CURRENT pointer is replaced in a single step, so readers always see
+    # either the previous or the new version as a whole. The previous version is
+    # kept for readers that resolved it before the switch, older versions and
+    # versions left behind by interrupted extractions are removed.
+    previous = current_dataset(root)
+    with open(os.path.join(root, "CURRENT.tmp"), "w") as file:
+        file.write(os.path.basename(version))
+    os.replace(os.path.join(root, "CURRENT.tmp"), os.path.join(root, "CURRENT"))
+    for name in os.listdir(os.path.join(root, "versions")):
+        path = os.path.join(root, "versions", name)
+        if path not in (version, previous):
+            shutil.rmtree(path)
+    if previous != root:
+        for section in ["users"] + SECTIONS:
+            shutil.rmtree(os.path.join(root, section), ignore_errors=True)
+
+
+def list_buckets(root):
+    return sorted(
+        int(name.split("=")[1])
+        for name in os.listdir(os.path.join(root, "users"))
+        if name.startswith("bucket=")
+    )
+
+
+def read_section(root, section, user_id_range=None, bucket_size=BUCKET_SIZE):
+    path = os.path.join(root, section)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["user_id"])
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    columns = [name for name in dataset.schema.names if name != "bucket"]
+    expression = None
+    if user_id_range:
+        # The bucket bounds prune whole partitions, the user_id bounds are pushed
+        # down to the row group statistics.
+        start, end = user_id_range
+        expression = (
+            (ds.field("bucket") >= start // bucket_size)
+            & (ds.field("bucket") <= (end - 1) // bucket_size)
+            & (ds.field("user_id") >= start)
+            & (ds.field("user_id") < end)
+        )
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def read_partition(root, user_id_range=None, bucket_size=BUCKET_SIZE):
+    users = read_section(root, "users", user_id_range, bucket_size)
+    frames = {
+        section: read_section(root, section, user_id_range, bucket_size)
+        for section in SECTIONS
+    }
+    return users, frames
+
+
+def serialize_section(df, section):
+    # Builds the same "<section>_<i>_<field>: <value>" pairs as flatten_json for
+    # every row at once, then joins them per user. Null values are skipped and
+    # list fields expand to "<field>_<j>: <item>" pairs.
+    position = df.groupby("user_id", sort=False).cumcount().astype(str)
+    prefix = section + "_" + position + "_"
+    text = pd.Series("", index=df.index)
+    for field in df.columns.drop("user_id"):
+        if field in LIST_FIELDS.get(section, []):
+            part = pd.Series(
+                [
+                    " ".join(
+                        f"{row_prefix}{field}_{i}: {item}"
+                        for i, item in enumerate(items or [])
+                    )
+                    for row_prefix, items in zip(prefix, df[field])
+                ],
+                index=df.index,
+            )
+        else:
+            part = (prefix + f"{field}: " + df[field]).fillna("")
+        text = text + (" " + part).where(part != "", "")
+    # The rows of a user are joined in a single pass, a groupby aggregation
+    # builds a Series for every user.
+    rows = {}
+    for user_id, row in zip(df["user_id"].tolist(), text.str[1:].tolist()):
+        rows.setdefault(user_id, []).append(row)
+    return pd.Series({user_id: " ".join(parts) for user_id, parts in rows.items()})
+
+
+def serialize_partition(users, frames):
+    text = "user_id: " + users["uuid"]
+    for section in SECTIONS:
+        df = frames[section]
+        if df.empty or len(df.columns) == 1:
+            continue
+        section_text = users["user_id"].map(serialize_section(df, section))
+        text = text + (" " + section_text).fillna("")
+    return text.tolist()
+
+
+def count_partition_tokens(users, frames):
+    # Equals count_tokens over serialize_partition of the raw frames without
+    # building the text: every "<key>:" is two tokens and is separated from its
+    # value by a space.
+    tokens = 2 + users["uuid"].str.count(TOKEN_PATTERN.pattern)
+    for section in SECTIONS:
+        df = frames[section]
+        if df.empty or len(df.columns) == 1:
+            continue
+        fields = df.drop(columns="user_id")
+        section_tokens = 2 * len(fields.columns) + sum(
+            fields[field].str.count(TOKEN_PATTERN.pattern) for field in fields.columns
+        )
+        per_user = section_tokens.groupby(df["user_id"].to_numpy()).sum()
+        tokens = tokens + users["user_id"].map(per_user).fillna(0)
+    return tokens.astype(int).tolist()
+
+
+def partition_profiles(users, frames):
+    profiles = {
+        user_id: {"user_id": uuid, **{section: [] for section in SECTIONS}}
+        for user_id, uuid in zip(users["user_id"], users["uuid"])
+    }
+    for section, df in frames.items():
+        records = df.drop(columns="user_id").to_dict(orient="records")
+        for user_id, record in zip(df["user_id"], records):
+            if user_id in profiles:
+                # Null values were removed by the normalization
+                profiles[user_id][section].append(
+                    {
+                        field: value
+                        for field, value in record.items()
+                        if value is not None and value == value
+                    }
+                )
+    return list(profiles.values())
+
+
+def build_partition(root, bucket, bucket_size=BUCKET_SIZE):
+    users, frames = read_partition(
+        root, (bucket * bucket_size, (bucket + 1) * bucket_size), bucket_size
+    )
+    tokens_before = count_partition_tokens(users, frames)
+    frames = {section: normalize_frame(df, section) for section, df in frames.items()}
+    texts = serialize_partition(users, frames)
+    return (
+        users["uuid"].tolist(),
+        texts,
+        partition_profiles(users, frames),
+        tokens_before,
+        [count_tokens(text) for text in texts],
+    )
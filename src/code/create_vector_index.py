@@ -1,10 +1,21 @@
 import json
 import os
+import sys
 
 from dotenv import load_dotenv
 from google.cloud import aiplatform
 from google.oauth2 import service_account
-from langchain_google_vertexai import VertexAIEmbeddings
+
+# Add the src directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.code.embedders import (
+    EMBEDDING_MODEL,
+    get_embedder,
+    register_index,
+    validate_dimensions,
+)
+from src.code.reduction import Reducer
 
 load_dotenv()
 
@@ -15,47 +26,97 @@ BUCKET = os.environ["GCS_BUCKET"]
 BUCKET_URI = f"gs://{BUCKET}"
 CREDENTIALS = os.environ["GCS_CREDENTIAL_FILE"]
 
-# The number of dimensions for the textembedding-gecko@003 is 768
-# If other embedder is used, the dimensions would probably need to change.
-DIMENSIONS = os.environ["DIMENSIONS"]
+# Optional reduction fitted by fit_reduction.py, applied to every corpus and query
+# vector of the index.
+REDUCTION_PATH = os.environ.get("REDUCTION_PATH")
+
+# The dimensions default to the output size of EMBEDDING_MODEL (or of the
+# reduction) and are checked against it before the index is created.
+DIMENSIONS = int(
+    os.environ.get(
+        "DIMENSIONS",
+        (
+            Reducer.load(REDUCTION_PATH).dimensions
+            if REDUCTION_PATH
+            else get_embedder(EMBEDDING_MODEL)["dimensions"]
+        ),
+    )
+)
 
 # Index Constants
 DISPLAY_NAME = os.environ["DISPLAY_NAME"]
 DEPLOYED_INDEX_ID = os.environ["DEPLOYED_INDEX_ID"]
 
-with open(CREDENTIALS) as f:
-    service_account_info = json.load(f)
 
-my_credentials = service_account.Credentials.from_service_account_info(
-    service_account_info
-)
+def init_aiplatform():
+    with open(CREDENTIALS) as f:
+        service_account_info = json.load(f)
 
-aiplatform.init(
-    project=PROJECT_ID,
-    location=REGION,
-    staging_bucket=BUCKET_URI,
-    credentials=my_credentials,
-)
-embedding_model = VertexAIEmbeddings(model_name="textembedding-gecko@003")
+    my_credentials = service_account.Credentials.from_service_account_info(
+        service_account_info
+    )
 
+    aiplatform.init(
+        project=PROJECT_ID,
+        location=REGION,
+        staging_bucket=BUCKET_URI,
+        credentials=my_credentials,
+    )
 
-# NOTE : This operation can take upto 30 seconds
-my_index = aiplatform.MatchingEngineIndex.create_tree_ah_index(
-    display_name=DISPLAY_NAME,
-    dimensions=DIMENSIONS,
-    approximate_neighbors_count=150,
-    distance_measure_type="DOT_PRODUCT_DISTANCE",
-    index_update_method="STREAM_UPDATE",
-)
 
-# Create an endpoint
-my_index_endpoint = aiplatform.MatchingEngineIndexEndpoint.create(
-    display_name=f"{DISPLAY_NAME}-endpoint", public_endpoint_enabled=True
-)
+def create_index(
+    display_name,
+    deployed_index_id,
+    model_name,
+    dimensions,
+    activate=None,
+    reduction=None,
+):
+    dimensions = validate_dimensions(model_name, dimensions, reduction)
+
+    # NOTE : This operation can take upto 30 seconds
+    my_index = aiplatform.MatchingEngineIndex.create_tree_ah_index(
+        display_name=display_name,
+        dimensions=dimensions,
+        approximate_neighbors_count=150,
+        distance_measure_type="DOT_PRODUCT_DISTANCE",
+        index_update_method="STREAM_UPDATE",
+    )
+
+    # Create an endpoint
+    my_index_endpoint = aiplatform.MatchingEngineIndexEndpoint.create(
+        display_name=f"{display_name}-endpoint", public_endpoint_enabled=True
+    )
+
+    # NOTE : This operation can take upto 20 minutes
+    my_index_endpoint = my_index_endpoint.deploy_index(
+        index=my_index, deployed_index_id=deployed_index_id
+    )
+
+    return register_index(
+        my_index.name,
+        my_index_endpoint.name,
+        deployed_index_id,
+        model_name,
+        dimensions,
+        activate=activate,
+        reduction=reduction,
+        display_name=display_name,
+    )
+
+
+def main():
+    init_aiplatform()
+    print(
+        create_index(
+            DISPLAY_NAME,
+            DEPLOYED_INDEX_ID,
+            EMBEDDING_MODEL,
+            DIMENSIONS,
+            reduction=REDUCTION_PATH,
+        )
+    )
 
-# NOTE : This operation can take upto 20 minutes
-my_index_endpoint = my_index_endpoint.deploy_index(
-    index=my_index, deployed_index_id=DEPLOYED_INDEX_ID
-)
 
-my_index_endpoint.deployed_indexes
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import os
+import re
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import errors
+from psycopg2.pool import ThreadedConnectionPool
+
+# Database Constants
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 4))
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 300000))
+DB_RETRIES = int(os.environ.get("DB_RETRIES", 3))
+DB_RETRY_BACKOFF_SECONDS = float(os.environ.get("DB_RETRY_BACKOFF_SECONDS", 2))
+
+# TCP keepalives let long extraction runs notice dropped connections instead of
+# hanging on a dead socket.
+CONNECTION_OPTIONS = {
+    "connect_timeout": 10,
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 5,
+    "application_name": "vector-search",
+}
+
+
+def query_label(query):
+    # Metrics are grouped by the first table a query reads from
+    match = re.search(r"\bfrom\s+(\w+)", query, re.IGNORECASE)
+    return match.group(1) if match else " ".join(query.split())[:80]
+
+
+class Database:
+    def __init__(self, name, config, replica_config=None):
+        self.name = name
+        self.config = config
+        self.replica_config = replica_config
+        self.pools = {}
+        self.metrics = {}
+
+    def pool(self, read_only):
+        # Read-only queries go to the replica when one is configured. Pools are
+        # created on first use, so importing a module opens no connections.
+        key = "replica" if read_only and self.replica_config else "primary"
+        if key not in self.pools:
+            config = self.replica_config if key == "replica" else self.config
+            self.pools[key] = ThreadedConnectionPool(
+                DB_POOL_MIN, DB_POOL_MAX, **CONNECTION_OPTIONS, **config
+            )
+        return self.pools[key]
+
+    def checkout(self, pool):
+        # Idle connections may have been dropped by the server, e.g. when a
+        # replica restarts, so every connection is pinged before it is handed
+        # out. Dead ones are discarded and the pool opens new ones.
+        for _ in range(DB_POOL_MAX):
+            conn = pool.getconn()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("select 1")
+                conn.rollback()
+                return conn
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                pool.putconn(conn, close=True)
+        return pool.getconn()
+
+    @contextmanager
+    def connection(self, read_only=True):
+        pool = self.pool(read_only)
+        conn = self.checkout(pool)
+        broken = False
+        try:
+            conn.readonly = read_only
+            yield conn
+            conn.commit()
+        except errors.QueryCanceled:
+            # QueryCanceled is an OperationalError, but a statement timeout
+            # leaves the session usable once it is rolled back.
+            conn.rollback()
+            raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # The session may be unusable, so it is closed and replaced by the
+            # pool instead of being handed out again.
+            broken = True
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn, close=broken or bool(conn.closed))
+
+    def fetchall(self, query, params=None, label=None, timeout_ms=None):
+        timeout_ms = timeout_ms or DB_STATEMENT_TIMEOUT_MS
+        for attempt in range(DB_RETRIES):
+            try:
+                with self.connection(read_only=True) as conn:
+                    with conn.cursor() as cur:
+                        cur.execute("set local statement_timeout = %s", (timeout_ms,))
+                        start = time.perf_counter()
+                        cur.execute(query, params)
+                        rows = cur.fetchall()
+                        self.record(
+                            label or query_label(query),
+                            time.perf_counter() - start,
+                            rows,
+                        )
+                        return rows
+            except errors.QueryCanceled:
+                raise
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as error:
+                if attempt == DB_RETRIES - 1:
+                    raise
+                print(f"{self.name}: retrying after {error}")
+                time.sleep(DB_RETRY_BACKOFF_SECONDS * 2**attempt)
+
+    def record(self, label, seconds, rows):
+        metric = self.metrics.setdefault(
+            label,
+            {"queries": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0, "bytes": 0},
+        )
+        metric["queries"] += 1
+        metric["seconds"] += seconds
+        metric["max_seconds"] = max(metric["max_seconds"], seconds)
+        metric["rows"] += len(rows)
+        # Approximate size of the result as text
+        metric["bytes"] += sum(len(str(value)) for row in rows for value in row)
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.closeall()
+        self.pools = {}
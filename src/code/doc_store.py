@@ -0,0 +1,69 @@
+import json
+import sqlite3
+
+# SQLite caps the number of bound parameters per statement
+MAX_VARIABLES = 900
+
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "create table if not exists profiles (user_id text primary key, document text)"
+    )
+    return conn
+
+
+def sync_profiles(conn, data_dict):
+    user_ids = [data["user_id"] for data in data_dict]
+    with conn:
+        conn.execute("create temp table current_users (user_id text primary key)")
+        conn.executemany(
+            "insert or ignore into current_users values (?)",
+            [(user_id,) for user_id in user_ids],
+        )
+        conn.execute(
+            "delete from profiles where user_id not in (select user_id from current_users)"
+        )
+        conn.execute("drop table current_users")
+        conn.executemany(
+            "insert or replace into profiles values (?, ?)",
+            [(data["user_id"], json.dumps(data)) for data in data_dict],
+        )
+
+
+def upsert_profiles(conn, data_dict):
+    with conn:
+        conn.executemany(
+            "insert or replace into profiles values (?, ?)",
+            [(data["user_id"], json.dumps(data)) for data in data_dict],
+        )
+
+
+def delete_profiles(conn, user_ids):
+    with conn:
+        conn.executemany(
+            "delete from profiles where user_id = ?",
+            [(user_id,) for user_id in user_ids],
+        )
+
+
+def fetch_profiles(conn, user_ids, fields):
+    # Only the requested sections are extracted from the stored documents, one
+    # query per MAX_VARIABLES user ids.
+    user_ids = list(dict.fromkeys(user_ids))
+    columns = ", ".join("json_quote(json_extract(document, ?))" for _ in fields)
+    paths = [f"$.{field}" for field in fields]
+    profiles = {}
+    for i in range(0, len(user_ids), MAX_VARIABLES):
+        batch = user_ids[i : i + MAX_VARIABLES]
+        placeholders = ", ".join("?" for _ in batch)
+        rows = conn.execute(
+            f"select user_id, {columns} from profiles where user_id in ({placeholders})",
+            paths + batch,
+        )
+        for user_id, *values in rows:
+            profiles[user_id] = {
+                field: json.loads(value) if value is not None else None
+                for field, value in zip(fields, values)
+            }
+    return profiles
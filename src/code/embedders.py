@@ -0,0 +1,157 @@
+import json
+import os
+
+from google.cloud import aiplatform
+from langchain_google_vertexai import VectorSearchVectorStore, VertexAIEmbeddings
+
+from src.code.reduction import Reducer, ReducedEmbeddings, reduction_hash
+
+# Output dimensions and normalization of the supported embedding models. Vertex AI
+# text embeddings are unit length, which DOT_PRODUCT_DISTANCE relies on. Matryoshka
+# models can be reduced by prefix truncation.
+EMBEDDERS = {
+    "textembedding-gecko@003": {
+        "dimensions": 768,
+        "normalized": True,
+        "matryoshka": False,
+    },
+    "text-embedding-004": {"dimensions": 768, "normalized": True, "matryoshka": True},
+    "text-embedding-005": {"dimensions": 768, "normalized": True, "matryoshka": True},
+    "text-multilingual-embedding-002": {
+        "dimensions": 768,
+        "normalized": True,
+        "matryoshka": True,
+    },
+}
+
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "textembedding-gecko@003")
+INDEX_REGISTRY_PATH = os.environ.get("INDEX_REGISTRY_PATH", "data/index_registry.json")
+
+
+def get_embedder(model_name):
+    if model_name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedding model: {model_name}")
+    return EMBEDDERS[model_name]
+
+
+def get_embedding_model(model_name, reduction=None, expected_hash=None):
+    get_embedder(model_name)
+    embedding_model = VertexAIEmbeddings(model_name=model_name)
+    if reduction:
+        # A reduction file that changed since the index was registered would
+        # project the queries differently from the indexed vectors.
+        if expected_hash and reduction_hash(reduction) != expected_hash:
+            raise ValueError(
+                f"{reduction} changed since the index was registered, "
+                "restore it or re-create the index"
+            )
+        return ReducedEmbeddings(embedding_model, Reducer.load(reduction))
+    return embedding_model
+
+
+def validate_reduction(model_name, reduction):
+    embedder = get_embedder(model_name)
+    reducer = Reducer.load(reduction)
+    if reducer.input_dimensions != embedder["dimensions"]:
+        raise ValueError(
+            f"{reduction} was fitted on {reducer.input_dimensions} dimensions, "
+            f"{model_name} produces {embedder['dimensions']}"
+        )
+    if reducer.method == "truncate" and not embedder["matryoshka"]:
+        raise ValueError(f"{model_name} does not support prefix truncation")
+    return reducer
+
+
+def validate_dimensions(model_name, dimensions, reduction=None):
+    if reduction:
+        expected = validate_reduction(model_name, reduction).dimensions
+    else:
+        expected = get_embedder(model_name)["dimensions"]
+    if int(dimensions) != expected:
+        raise ValueError(
+            f"{model_name} produces {expected} dimensions, the index expects {dimensions}"
+        )
+    return int(dimensions)
+
+
+def load_registry(path=INDEX_REGISTRY_PATH):
+    if not os.path.exists(path):
+        return {"active": None, "indexes": {}}
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def save_registry(registry, path=INDEX_REGISTRY_PATH):
+    # Written to a temporary file and renamed, so readers always see either the
+    # previous or the new registry.
+    with open(f"{path}.tmp", "w") as file:
+        file.write(json.dumps(registry, indent=2))
+    os.replace(f"{path}.tmp", path)
+
+
+def register_index(
+    index_id,
+    endpoint_id,
+    deployed_index_id,
+    model_name,
+    dimensions,
+    activate=None,
+    reduction=None,
+    **extra,
+):
+    registry = load_registry()
+    registry["indexes"][index_id] = {
+        "index_id": index_id,
+        "endpoint_id": endpoint_id,
+        "deployed_index_id": deployed_index_id,
+        "model": model_name,
+        "dimensions": validate_dimensions(model_name, dimensions, reduction),
+        "normalized": get_embedder(model_name)["normalized"] or bool(reduction),
+        "reduction": reduction,
+        "reduction_hash": reduction_hash(reduction) if reduction else None,
+        **extra,
+    }
+    # By default the first registered index becomes the active one
+    if activate or (activate is None and registry["active"] is None):
+        registry["active"] = index_id
+    save_registry(registry)
+    return registry["indexes"][index_id]
+
+
+def activate_index(index_id):
+    registry = load_registry()
+    if index_id not in registry["indexes"]:
+        raise ValueError(f"Index {index_id} is not registered")
+    registry["active"] = index_id
+    save_registry(registry)
+
+
+def get_active_index(default_index_id, default_endpoint_id):
+    # Indexes created before the registry existed fall back to the INDEX_ID and
+    # INDEX_ENDPOINT_ID environment variables.
+    registry = load_registry()
+    if registry["active"] is not None:
+        return registry["indexes"][registry["active"]]
+    return {
+        "index_id": default_index_id,
+        "endpoint_id": default_endpoint_id,
+        "model": EMBEDDING_MODEL,
+        "dimensions": get_embedder(EMBEDDING_MODEL)["dimensions"],
+        "normalized": get_embedder(EMBEDDING_MODEL)["normalized"],
+    }
+
+
+def get_vector_store(index, project_id, region, bucket, stream_update=True):
+    my_index = aiplatform.MatchingEngineIndex(index["index_id"])
+    my_index_endpoint = aiplatform.MatchingEngineIndexEndpoint(index["endpoint_id"])
+    return VectorSearchVectorStore.from_components(
+        project_id=project_id,
+        region=region,
+        gcs_bucket_name=bucket,
+        index_id=my_index.name,
+        endpoint_id=my_index_endpoint.name,
+        embedding=get_embedding_model(
+            index["model"], index.get("reduction"), index.get("reduction_hash")
+        ),
+        stream_update=stream_update,
+    )
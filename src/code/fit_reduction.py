@@ -0,0 +1,169 @@
+import json
+import os
+import random
+import sys
+
+import numpy as np
+from dotenv import load_dotenv
+from google.cloud import aiplatform
+from google.oauth2 import service_account
+
+# Add the src directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.code.add_datapoints import chunking, load_documents
+from src.code.embedders import EMBEDDING_MODEL, get_embedder, get_embedding_model
+from src.code.local_index import top_k_tiled
+from src.code.reduction import Reducer
+
+load_dotenv()
+
+# Project and Storage Constants
+PROJECT_ID = os.environ["GCS_PROJECT_ID"]
+REGION = os.environ["GCS_REGION"]
+BUCKET = os.environ["GCS_BUCKET"]
+BUCKET_URI = f"gs://{BUCKET}"
+CREDENTIALS = os.environ["GCS_CREDENTIAL_FILE"]
+
+# Reduction Constants
+# REDUCTION_METHOD is "pca", "random" (gaussian random projection) or "truncate"
+# (prefix truncation, only for Matryoshka models).
+REDUCTION_METHOD = os.environ.get("REDUCTION_METHOD", "pca")
+REDUCTION_PATH = os.environ.get("REDUCTION_PATH", "data/reduction.npz")
+REDUCTION_REPORT_PATH = os.environ.get(
+    "REDUCTION_REPORT_PATH", "data/reduction_report.json"
+)
+REDUCTION_QUERIES_PATH = os.environ.get("REDUCTION_QUERIES_PATH")
+REDUCTION_CANDIDATES = [
+    int(dimensions)
+    for dimensions in os.environ.get(
+        "REDUCTION_CANDIDATES", "64,128,192,256,384,512"
+    ).split(",")
+]
+# When REDUCED_DIMENSIONS is not set, the smallest candidate reaching the target
+# recall is used.
+REDUCED_DIMENSIONS = os.environ.get("REDUCED_DIMENSIONS")
+REDUCTION_TARGET_RECALL = float(os.environ.get("REDUCTION_TARGET_RECALL", 0.95))
+REDUCTION_SAMPLE_SIZE = int(os.environ.get("REDUCTION_SAMPLE_SIZE", 5000))
+REDUCTION_HELD_OUT_QUERIES = int(os.environ.get("REDUCTION_HELD_OUT_QUERIES", 200))
+REDUCTION_K = int(os.environ.get("REDUCTION_K", 10))
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 250))
+
+
+def exact_top_k(queries, corpus, k):
+    return np.concatenate([ids for _, ids, _ in top_k_tiled(queries, corpus, k)])
+
+
+def recall_at_k(expected, actual):
+    return float(
+        np.mean(
+            [
+                len(set(row) & set(other)) / len(row)
+                for row, other in zip(expected, actual)
+            ]
+        )
+    )
+
+
+def dimension_report(method, corpus, queries, candidates, k):
+    # Recall is measured against exact search with the full vectors, so it only
+    # reflects the loss caused by the reduction.
+    expected = exact_top_k(queries, corpus, k)
+    report = []
+    for dimensions in candidates:
+        reducer = Reducer.fit(method, corpus, dimensions)
+        actual = exact_top_k(reducer.transform(queries), reducer.transform(corpus), k)
+        report.append(
+            {"dimensions": dimensions, "recall_at_k": recall_at_k(expected, actual)}
+        )
+    return report
+
+
+def choose_dimensions(report, target_recall):
+    for row in sorted(report, key=lambda row: row["dimensions"]):
+        if row["recall_at_k"] >= target_recall:
+            return row["dimensions"]
+    return None
+
+
+def main():
+    # Indexes registered with a reduction keep using its file, so a new fit
+    # must be written to a new path.
+    if os.path.exists(REDUCTION_PATH):
+        raise ValueError(f"{REDUCTION_PATH} already exists, set another REDUCTION_PATH")
+
+    with open(CREDENTIALS) as f:
+        service_account_info = json.load(f)
+
+    my_credentials = service_account.Credentials.from_service_account_info(
+        service_account_info
+    )
+
+    aiplatform.init(
+        project=PROJECT_ID,
+        location=REGION,
+        staging_bucket=BUCKET_URI,
+        credentials=my_credentials,
+    )
+    embedder = get_embedder(EMBEDDING_MODEL)
+    if REDUCTION_METHOD == "truncate" and not embedder["matryoshka"]:
+        raise ValueError(f"{EMBEDDING_MODEL} does not support prefix truncation")
+    embedding_model = get_embedding_model(EMBEDDING_MODEL)
+
+    _, serialized_data, _ = load_documents()
+    held_out = 0 if REDUCTION_QUERIES_PATH else REDUCTION_HELD_OUT_QUERIES
+    sample = random.Random(0).sample(
+        serialized_data, min(len(serialized_data), REDUCTION_SAMPLE_SIZE + held_out)
+    )
+    vectors = []
+    for batch in chunking(sample, EMBEDDING_BATCH_SIZE):
+        vectors.extend(embedding_model.embed_documents(batch))
+    vectors = np.asarray(vectors, dtype=np.float32)
+
+    if REDUCTION_QUERIES_PATH:
+        with open(REDUCTION_QUERIES_PATH, "r") as file:
+            queries = np.asarray(
+                [embedding_model.embed_query(query) for query in json.load(file)],
+                dtype=np.float32,
+            )
+        corpus = vectors
+    else:
+        queries, corpus = vectors[:held_out], vectors[held_out:]
+
+    candidates = [d for d in REDUCTION_CANDIDATES if d < embedder["dimensions"]]
+    if REDUCTION_METHOD == "pca":
+        # PCA has at most as many components as sample vectors
+        candidates = [d for d in candidates if d <= len(corpus)]
+    report = dimension_report(
+        REDUCTION_METHOD, corpus, queries, candidates, REDUCTION_K
+    )
+    if REDUCED_DIMENSIONS:
+        dimensions = int(REDUCED_DIMENSIONS)
+    else:
+        dimensions = choose_dimensions(report, REDUCTION_TARGET_RECALL)
+
+    # NOTE : Without a candidate reaching the target recall there is nothing to
+    # reduce, and a full-rank projection would only add cost to every vector, so
+    # no reduction file is written.
+    if dimensions is not None:
+        Reducer.fit(REDUCTION_METHOD, corpus, dimensions).save(REDUCTION_PATH)
+    summary = {
+        "model": EMBEDDING_MODEL,
+        "method": REDUCTION_METHOD,
+        "k": REDUCTION_K,
+        "target_recall": REDUCTION_TARGET_RECALL,
+        "dimensions": dimensions,
+        "report": report,
+    }
+    with open(REDUCTION_REPORT_PATH, "w") as file:
+        file.write(json.dumps(summary, indent=2))
+    print(json.dumps(summary, indent=2))
+    if dimensions is None:
+        print(
+            f"No candidate reaches a recall@{REDUCTION_K} of "
+            f"{REDUCTION_TARGET_RECALL}, no reduction was written"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import uuid
+
+# Fixed namespace so that the same user and section always map to the same
+# datapoint id across runs.
+DATAPOINT_NAMESPACE = uuid.UUID("6f1d7a52-8f0e-4c1b-9a59-3f4b8f6c2e11")
+
+
+def datapoint_id(user_id, section="profile"):
+    return str(uuid.uuid5(DATAPOINT_NAMESPACE, f"{user_id}/{section}"))
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def build_manifest(user_ids, texts, section="profile"):
+    return {
+        datapoint_id(user_id, section): {"user_id": user_id, "hash": text_hash(text)}
+        for user_id, text in zip(user_ids, texts)
+    }
+
+
+def plan_diff(previous, current):
+    upserts = [
+        key
+        for key, entry in current.items()
+        if previous.get(key, {}).get("hash") != entry["hash"]
+    ]
+    removals = [key for key in previous if key not in current]
+    return upserts, removals
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def save_manifest(manifest, path):
+    with open(f"{path}.tmp", "w") as file:
+        file.write(json.dumps(manifest))
+    os.replace(f"{path}.tmp", path)
+
+
+# The manifest of the last ingested dataset is kept in SQLite, so acknowledged
+# batches are recorded with row upserts instead of rewriting the whole manifest.
+def init_manifest(conn):
+    with conn:
+        conn.execute(
+            "create table if not exists manifest"
+            " (datapoint_id text primary key, user_id text, hash text)"
+        )
+        conn.execute(
+            "create table if not exists ingest_state (name text primary key, value text)"
+        )
+
+
+def read_manifest(conn):
+    rows = conn.execute("select datapoint_id, user_id, hash from manifest")
+    return {key: {"user_id": user_id, "hash": hash} for key, user_id, hash in rows}
+
+
+def upsert_manifest(conn, entries):
+    with conn:
+        conn.executemany(
+            "insert or replace into manifest values (?, ?, ?)",
+            [(key, entry["user_id"], entry["hash"]) for key, entry in entries.items()],
+        )
+
+
+def delete_manifest(conn, keys):
+    with conn:
+        conn.executemany(
+            "delete from manifest where datapoint_id = ?", [(key,) for key in keys]
+        )
+
+
+def replace_manifest(conn, manifest):
+    with conn:
+        conn.execute("delete from manifest")
+        conn.executemany(
+            "insert into manifest values (?, ?, ?)",
+            [(key, entry["user_id"], entry["hash"]) for key, entry in manifest.items()],
+        )
+
+
+def get_ingest_state(conn, name):
+    row = conn.execute(
+        "select value from ingest_state where name = ?", (name,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def set_ingest_state(conn, name, value):
+    with conn:
+        conn.execute("insert or replace into ingest_state values (?, ?)", (name, value))
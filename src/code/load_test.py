@@ -0,0 +1,190 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+# Add the src directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.code.local_index import top_k_tiled
+from src.code.normalization import count_tokens, normalize_profile
+from src.code.serialization import serialize_document
+from src.code.synthetic_data import generate_documents, seed_databases, seed_postgres
+
+load_dotenv()
+
+# Load Test Constants
+LOAD_TEST_SCALES = [
+    int(scale)
+    for scale in os.environ.get(
+        "LOAD_TEST_SCALES", "10000,100000,1000000,10000000"
+    ).split(",")
+]
+LOAD_TEST_DIMENSIONS = int(os.environ.get("LOAD_TEST_DIMENSIONS", 768))
+LOAD_TEST_EMBEDDING_SAMPLE = int(os.environ.get("LOAD_TEST_EMBEDDING_SAMPLE", 10000))
+LOAD_TEST_QUERIES = int(os.environ.get("LOAD_TEST_QUERIES", 100))
+LOAD_TEST_LATENCY_QUERIES = int(os.environ.get("LOAD_TEST_LATENCY_QUERIES", 20))
+LOAD_TEST_TOP_K = int(os.environ.get("LOAD_TEST_TOP_K", 10))
+LOAD_TEST_POSTGRES = os.environ.get("LOAD_TEST_POSTGRES") == "true"
+LOAD_TEST_DIR = os.environ.get("LOAD_TEST_DIR", "data/load_test")
+LOAD_TEST_REPORT = os.environ.get("LOAD_TEST_REPORT", "data/load_test.jsonl")
+
+EXTRACTORS = [
+    "get_preferred_work_locations",
+    "get_user_awards",
+    "get_user_certifications",
+    "get_user_computed_fields",
+    "get_user_interests",
+    "get_user_languages",
+    "get_user_profiles",
+    "get_user_projects",
+    "get_user_publications",
+    "get_user_qualifications",
+    "get_user_skills",
+    "get_user_subject_experiences",
+    "get_user_subject_interests",
+    "get_user_test_scores",
+    "get_user_work_experiences",
+]
+
+
+def percentiles(latencies):
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def benchmark_extraction(count):
+    # NOTE : The load test seeds and extracts from its own databases only. The
+    # extractors read the module level solis_db and gravity_db, so those are
+    # pointed at the load test databases before anything is extracted.
+    solis_db, gravity_db = seed_databases()
+    from src.code import user_data_retrieval_script as retrieval
+
+    retrieval.solis_db, retrieval.gravity_db = solis_db, gravity_db
+    with solis_db.connection(read_only=False) as solis_conn, gravity_db.connection(
+        read_only=False
+    ) as gravity_conn:
+        seed_postgres(solis_conn, gravity_conn, count)
+    rows = 0
+    start = time.perf_counter()
+    for i in range(0, count, 1000):
+        user_ids = list(range(i + 1, min(i + 1000, count) + 1))
+        for extractor in EXTRACTORS:
+            grouped = getattr(retrieval, extractor)(user_ids)
+            rows += sum(len(records) for records in grouped.values())
+    seconds = time.perf_counter() - start
+    solis_db.close()
+    gravity_db.close()
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds,
+        "queries": {
+            "solis": solis_db.metrics,
+            "gravity": gravity_db.metrics,
+        },
+    }
+
+
+def benchmark_serialization(count):
+    size = 0
+    seconds = 0.0
+    tokens_before = 0
+    tokens_after = 0
+    for document in generate_documents(count):
+        start = time.perf_counter()
+        text = serialize_document(normalize_profile(document))
+        size += len(text.encode("utf-8"))
+        seconds += time.perf_counter() - start
+        tokens_before += count_tokens(serialize_document(document))
+        tokens_after += count_tokens(text)
+    return {
+        "documents": count,
+        "megabytes": size / 1e6,
+        "seconds": seconds,
+        "mb_per_second": size / 1e6 / seconds,
+        "documents_per_second": count / seconds,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+    }
+
+
+def benchmark_embedding(count):
+    texts = [
+        serialize_document(normalize_profile(document))
+        for document in generate_documents(min(count, LOAD_TEST_EMBEDDING_SAMPLE))
+    ]
+    embedding_model = DeterministicFakeEmbedding(size=LOAD_TEST_DIMENSIONS)
+    start = time.perf_counter()
+    embedding_model.embed_documents(texts)
+    seconds = time.perf_counter() - start
+    return {
+        "documents": len(texts),
+        "seconds": seconds,
+        "documents_per_second": len(texts) / seconds,
+    }
+
+
+def random_unit_vectors(rng, count, dimensions):
+    vectors = rng.standard_normal((count, dimensions), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def benchmark_search(count):
+    # The corpus is written to a memory-mapped file in chunks, so scales larger
+    # than memory exercise the same tiled scan that reverse matching uses.
+    rng = np.random.default_rng(count)
+    os.makedirs(LOAD_TEST_DIR, exist_ok=True)
+    corpus = np.lib.format.open_memmap(
+        os.path.join(LOAD_TEST_DIR, f"corpus_{count}.npy"),
+        mode="w+",
+        dtype=np.float32,
+        shape=(count, LOAD_TEST_DIMENSIONS),
+    )
+    for i in range(0, count, 100000):
+        corpus[i : i + 100000] = random_unit_vectors(
+            rng, min(100000, count - i), LOAD_TEST_DIMENSIONS
+        )
+    corpus.flush()
+    queries = random_unit_vectors(rng, LOAD_TEST_QUERIES, LOAD_TEST_DIMENSIONS)
+
+    latencies = []
+    for query in queries[:LOAD_TEST_LATENCY_QUERIES]:
+        start = time.perf_counter()
+        for _ in top_k_tiled(query[None], corpus, LOAD_TEST_TOP_K):
+            pass
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in top_k_tiled(queries, corpus, LOAD_TEST_TOP_K):
+        pass
+    seconds = time.perf_counter() - start
+    del corpus
+    os.remove(os.path.join(LOAD_TEST_DIR, f"corpus_{count}.npy"))
+    return {"queries": len(queries), "qps": len(queries) / seconds} | percentiles(
+        latencies
+    )
+
+
+def main():
+    with open(LOAD_TEST_REPORT, "w") as file:
+        for count in LOAD_TEST_SCALES:
+            report = {
+                "users": count,
+                "serialization": benchmark_serialization(count),
+                "embedding": benchmark_embedding(count),
+                "search": benchmark_search(count),
+            }
+            if LOAD_TEST_POSTGRES:
+                report["extraction"] = benchmark_extraction(count)
+            print(json.dumps(report))
+            file.write(json.dumps(report) + "\n")
+            file.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import json
+import os
+
+import numpy as np
+
+
+def save_embedding_index(path, ids, embeddings):
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "embeddings.npy"), np.asarray(embeddings, np.float32))
+    with open(os.path.join(path, "ids.json"), "w") as file:
+        file.write(json.dumps(list(ids)))
+
+
+def load_embedding_index(path, mmap=True):
+    embeddings = np.load(
+        os.path.join(path, "embeddings.npy"), mmap_mode="r" if mmap else None
+    )
+    with open(os.path.join(path, "ids.json"), "r") as file:
+        ids = json.load(file)
+    return ids, embeddings
+
+
+def top_k_tiled(queries, corpus, k, query_block=2048, corpus_block=8192):
+    # Scores are dot products, matching the DOT_PRODUCT_DISTANCE used by the
+    # deployed index. Only one (query_block x corpus_block) score tile and the
+    # running top-k of the current query block are held in memory at a time,
+    # so both matrices may be memory-mapped.
+    k = min(k, len(corpus))
+    for start in range(0, len(queries), query_block):
+        block = np.asarray(queries[start : start + query_block], dtype=np.float32)
+        best_scores = np.full((len(block), k), -np.inf, dtype=np.float32)
+        best_ids = np.full((len(block), k), -1, dtype=np.int64)
+        for offset in range(0, len(corpus), corpus_block):
+            tile = np.asarray(corpus[offset : offset + corpus_block], dtype=np.float32)
+            scores = block @ tile.T
+            tile_ids = np.broadcast_to(
+                np.arange(offset, offset + len(tile), dtype=np.int64), scores.shape
+            )
+            candidate_scores = np.concatenate([best_scores, scores], axis=1)
+            candidate_ids = np.concatenate([best_ids, tile_ids], axis=1)
+            top = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(candidate_scores, top, axis=1)
+            best_ids = np.take_along_axis(candidate_ids, top, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        yield (
+            start,
+            np.take_along_axis(best_ids, order, axis=1),
+            np.take_along_axis(best_scores, order, axis=1),
+        )
+
+
+class IVFIndex:
+    # Approximate search: the corpus is clustered with spherical k-means and a
+    # query only scores the vectors of its nprobe closest clusters.
+    def __init__(self, centroids, lists):
+        self.centroids = centroids
+        self.lists = lists
+
+    @classmethod
+    def build(
+        cls, corpus, nlist, iterations=10, sample_size=100000, seed=0, block=8192
+    ):
+        rng = np.random.default_rng(seed)
+        nlist = min(nlist, len(corpus))
+        sample = np.asarray(
+            corpus[
+                np.sort(
+                    rng.choice(
+                        len(corpus), min(len(corpus), sample_size), replace=False
+                    )
+                )
+            ],
+            dtype=np.float32,
+        )
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            # Empty clusters keep their previous centroid
+            filled = np.bincount(assignment, minlength=nlist) > 0
+            centroids[filled] = sums[filled]
+            centroids /= np.maximum(
+                np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12
+            )
+
+        assignment = np.concatenate(
+            [
+                np.argmax(
+                    np.asarray(corpus[i : i + block], dtype=np.float32) @ centroids.T,
+                    axis=1,
+                )
+                for i in range(0, len(corpus), block)
+            ]
+        )
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(1, nlist))
+        return cls(centroids, np.split(order, bounds))
+
+    def search(self, queries, corpus, k, nprobe):
+        queries = np.asarray(queries, dtype=np.float32)
+        nprobe = min(nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for i, query in enumerate(queries):
+            candidates = np.sort(
+                np.concatenate([self.lists[c] for c in probes[i, :nprobe]])
+            )
+            candidate_scores = np.asarray(corpus[candidates], dtype=np.float32) @ query
+            top = np.argsort(-candidate_scores, kind="stable")[:k]
+            ids[i, : len(top)] = candidates[top]
+            scores[i, : len(top)] = candidate_scores[top]
+        return ids, scores
@@ -0,0 +1,173 @@
+import json
+import os
+import sys
+
+import numpy as np
+from dotenv import load_dotenv
+from google.cloud import aiplatform
+from google.oauth2 import service_account
+
+# Add the src directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.code.add_datapoints import iter_partitions
+from src.code.embedders import EMBEDDING_MODEL, get_embedding_model
+from src.code.ingest_plan import build_manifest, text_hash
+from src.code.local_index import (
+    load_embedding_index,
+    save_embedding_index,
+    top_k_tiled,
+)
+
+load_dotenv()
+
+# Project and Storage Constants
+PROJECT_ID = os.environ["GCS_PROJECT_ID"]
+REGION = os.environ["GCS_REGION"]
+BUCKET = os.environ["GCS_BUCKET"]
+BUCKET_URI = f"gs://{BUCKET}"
+CREDENTIALS = os.environ["GCS_CREDENTIAL_FILE"]
+
+# Reverse Matching Constants
+JOBS_PATH = os.environ.get("JOBS_PATH", "data/jobs.json")
+JOB_INDEX_PATH = os.environ.get("JOB_INDEX_PATH", "data/job_index")
+TEACHER_INDEX_PATH = os.environ.get("TEACHER_INDEX_PATH", "data/teacher_index")
+MATCHES_PATH = os.environ.get("MATCHES_PATH", "data/teacher_matches.jsonl")
+TOP_K = int(os.environ.get("TOP_K", 10))
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 250))
+TEACHER_BLOCK_SIZE = int(os.environ.get("TEACHER_BLOCK_SIZE", 2048))
+JOB_BLOCK_SIZE = int(os.environ.get("JOB_BLOCK_SIZE", 8192))
+
+
+def chunking(data, size):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+def build_job_index(embedding_model, jobs, path):
+    job_ids = [job["job_id"] for job in jobs]
+    embeddings = []
+    for batch in chunking([job["description"] for job in jobs], EMBEDDING_BATCH_SIZE):
+        embeddings.extend(embedding_model.embed_documents(batch))
+    save_embedding_index(path, job_ids, embeddings)
+    return load_embedding_index(path)
+
+
+def build_teacher_index(embedding_model, partitions, count, path):
+    # Teacher embeddings are written straight into a memory-mapped file one
+    # partition at a time, so neither the profiles nor the whole teacher matrix
+    # ever have to be held in memory.
+    os.makedirs(path, exist_ok=True)
+    user_ids = []
+    embeddings = None
+    for partition_ids, texts, *_ in partitions:
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            batch = texts[start : start + EMBEDDING_BATCH_SIZE]
+            vectors = np.asarray(
+                embedding_model.embed_documents(batch), dtype=np.float32
+            )
+            if embeddings is None:
+                embeddings = np.lib.format.open_memmap(
+                    os.path.join(path, "embeddings.npy"),
+                    mode="w+",
+                    dtype=np.float32,
+                    shape=(count, vectors.shape[1]),
+                )
+            embeddings[len(user_ids) : len(user_ids) + len(batch)] = vectors
+            user_ids.extend(partition_ids[start : start + len(batch)])
+    if embeddings is None:
+        # No teachers, nothing was embedded
+        save_embedding_index(path, [], np.empty((0, 0), dtype=np.float32))
+        return load_embedding_index(path)
+    embeddings.flush()
+    with open(os.path.join(path, "ids.json"), "w") as file:
+        file.write(json.dumps(user_ids))
+    return load_embedding_index(path)
+
+
+def teacher_index_metadata(manifest):
+    # Identifies the profiles and the model a teacher index was embedded from
+    return {
+        "model": EMBEDDING_MODEL,
+        "manifest_hash": text_hash(json.dumps(manifest, sort_keys=True)),
+    }
+
+
+def load_teacher_index_metadata(path):
+    if not os.path.exists(os.path.join(path, "metadata.json")):
+        return None
+    with open(os.path.join(path, "metadata.json"), "r") as file:
+        return json.load(file)
+
+
+def save_teacher_index_metadata(path, metadata):
+    with open(os.path.join(path, "metadata.json"), "w") as file:
+        file.write(json.dumps(metadata))
+
+
+def write_matches(user_ids, teacher_embeddings, job_ids, job_embeddings, path):
+    with open(path, "w") as file:
+        for start, top_ids, top_scores in top_k_tiled(
+            teacher_embeddings,
+            job_embeddings,
+            TOP_K,
+            query_block=TEACHER_BLOCK_SIZE,
+            corpus_block=JOB_BLOCK_SIZE,
+        ):
+            for row, (ids, scores) in enumerate(zip(top_ids, top_scores)):
+                result = [
+                    {job_ids[job]: float(score)} for job, score in zip(ids, scores)
+                ]
+                file.write(
+                    json.dumps({"user_id": user_ids[start + row], "result": result})
+                    + "\n"
+                )
+
+
+def main():
+    with open(CREDENTIALS) as f:
+        service_account_info = json.load(f)
+
+    my_credentials = service_account.Credentials.from_service_account_info(
+        service_account_info
+    )
+
+    aiplatform.init(
+        project=PROJECT_ID,
+        location=REGION,
+        staging_bucket=BUCKET_URI,
+        credentials=my_credentials,
+    )
+    embedding_model = get_embedding_model(EMBEDDING_MODEL)
+
+    with open(JOBS_PATH, "r") as file:
+        jobs = json.load(file)
+    job_ids, job_embeddings = build_job_index(embedding_model, jobs, JOB_INDEX_PATH)
+
+    # Profiles are read through the same partitions as ingest (INGEST_SOURCE).
+    # A first pass only keeps the content hash of every profile, the profiles
+    # are read again to be embedded when the teacher index is stale.
+    manifest, count = {}, 0
+    for user_ids, texts, *_ in iter_partitions():
+        manifest.update(build_manifest(user_ids, texts))
+        count += len(user_ids)
+
+    # NOTE : Teacher embeddings are reused between runs as long as the profiles
+    # and the embedding model are unchanged. The metadata is removed before a
+    # rebuild and written last, so an interrupted build is never reused.
+    metadata = teacher_index_metadata(manifest)
+    if load_teacher_index_metadata(TEACHER_INDEX_PATH) == metadata:
+        user_ids, teacher_embeddings = load_embedding_index(TEACHER_INDEX_PATH)
+    else:
+        if os.path.exists(os.path.join(TEACHER_INDEX_PATH, "metadata.json")):
+            os.remove(os.path.join(TEACHER_INDEX_PATH, "metadata.json"))
+        user_ids, teacher_embeddings = build_teacher_index(
+            embedding_model, iter_partitions(), count, TEACHER_INDEX_PATH
+        )
+        save_teacher_index_metadata(TEACHER_INDEX_PATH, metadata)
+
+    write_matches(user_ids, teacher_embeddings, job_ids, job_embeddings, MATCHES_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import re
+
+import pandas as pd
+
+# Sections whose extraction query left-joins a child table, mapped to the joined
+# fields. Rows that only differ in these fields describe a single record.
+LIST_FIELDS = {"user_work_experiences": ["subject"]}
+
+# Free-text fields that are only kept the first time a value appears in a section
+DEDUPE_FIELDS = ["description"]
+
+# Words and punctuation, a rough stand-in for the embedding model's tokenizer that
+# is good enough to compare the size of a profile before and after normalization.
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text):
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def is_empty(value):
+    if value is None or value == []:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    # NaN is the only value that is not equal to itself
+    return value != value
+
+
+def collapse_fan_out(records, list_fields):
+    collapsed = {}
+    for record in records:
+        key = tuple(
+            (field, value)
+            for field, value in record.items()
+            if field not in list_fields
+        )
+        if key not in collapsed:
+            collapsed[key] = {
+                field: [] if field in list_fields else value
+                for field, value in record.items()
+            }
+        for field in list_fields:
+            value = record.get(field)
+            if not is_empty(value) and value not in collapsed[key][field]:
+                collapsed[key][field].append(value)
+    return list(collapsed.values())
+
+
+def dedupe_fields(records, fields):
+    seen = {field: set() for field in fields}
+    deduped = []
+    for record in records:
+        record = dict(record)
+        for field in fields:
+            value = record.get(field)
+            if is_empty(value):
+                continue
+            if value in seen[field]:
+                del record[field]
+            else:
+                seen[field].add(value)
+        deduped.append(record)
+    return deduped
+
+
+def drop_empty(record):
+    return {field: value for field, value in record.items() if not is_empty(value)}
+
+
+def normalize_records(records, list_fields=(), dedupe=DEDUPE_FIELDS):
+    if list_fields:
+        records = collapse_fan_out(records, list_fields)
+    records = [drop_empty(record) for record in dedupe_fields(records, dedupe)]
+    return [record for record in records if record]
+
+
+def normalize_profile(profile):
+    return {
+        section: (
+            normalize_records(value, LIST_FIELDS.get(section, ()))
+            if isinstance(value, list)
+            else value
+        )
+        for section, value in profile.items()
+    }
+
+
+def collect_values(values):
+    values = list(dict.fromkeys(value for value in values if not is_empty(value)))
+    return values or None
+
+
+def normalize_frame(df, section):
+    # Same rules as normalize_records, applied to a whole section of a partition
+    # at once. Empty values become nulls instead of being removed from a record.
+    if df.empty or len(df.columns) == 1:
+        return df
+    columns = list(df.columns)
+    list_fields = [field for field in LIST_FIELDS.get(section, []) if field in columns]
+    if list_fields:
+        keys = [column for column in columns if column not in list_fields]
+        # Groups are numbered in order of first appearance, so the first row of
+        # every group keeps its position and the joined values are gathered in
+        # one pass.
+        codes = df.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+        first = ~pd.Series(codes).duplicated().to_numpy()
+        collapsed = df[first].reset_index(drop=True)
+        for field in list_fields:
+            values = [[] for _ in range(len(collapsed))]
+            for code, value in zip(codes, df[field].tolist()):
+                values[code].append(value)
+            collapsed[field] = [collect_values(group) for group in values]
+        df = collapsed
+
+    for column in columns:
+        if column == "user_id" or column in list_fields:
+            continue
+        df[column] = df[column].where(df[column].astype(str).str.strip() != "")
+    for field in DEDUPE_FIELDS:
+        if field in columns:
+            repeated = df.duplicated(["user_id", field]) & df[field].notna()
+            df[field] = df[field].where(~repeated)
+
+    return df[df.drop(columns="user_id").notna().any(axis=1)].reset_index(drop=True)
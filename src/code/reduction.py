@@ -0,0 +1,103 @@
+import hashlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+METHODS = ("pca", "random", "truncate")
+
+
+def reduction_hash(path):
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+class Reducer:
+    def __init__(
+        self, method, input_dimensions, dimensions, mean=None, components=None
+    ):
+        if method not in METHODS:
+            raise ValueError(f"Unknown reduction method: {method}")
+        self.method = method
+        self.input_dimensions = input_dimensions
+        self.dimensions = dimensions
+        self.mean = mean
+        self.components = components
+
+    @classmethod
+    def fit(cls, method, vectors, dimensions, seed=0):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        input_dimensions = vectors.shape[1]
+        if dimensions > input_dimensions:
+            raise ValueError(
+                f"Cannot reduce {input_dimensions} dimensions to {dimensions}"
+            )
+        if method == "pca":
+            mean = vectors.mean(axis=0)
+            _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+            # There are at most as many components as sample vectors
+            if len(vt) < dimensions:
+                raise ValueError(
+                    f"PCA to {dimensions} dimensions needs at least {dimensions} "
+                    f"sample vectors, got {len(vectors)}"
+                )
+            return cls(method, input_dimensions, dimensions, mean, vt[:dimensions].T)
+        if method == "random":
+            rng = np.random.default_rng(seed)
+            components = rng.standard_normal(
+                (input_dimensions, dimensions), dtype=np.float32
+            ) / np.sqrt(dimensions)
+            return cls(method, input_dimensions, dimensions, None, components)
+        return cls(method, input_dimensions, dimensions)
+
+    def transform(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.method == "truncate":
+            reduced = vectors[:, : self.dimensions]
+        else:
+            if self.mean is not None:
+                vectors = vectors - self.mean
+            reduced = vectors @ self.components
+        # The index uses DOT_PRODUCT_DISTANCE, so the reduced vectors are brought
+        # back to unit length.
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        return reduced / np.maximum(norms, 1e-12)
+
+    def save(self, path):
+        arrays = {
+            "method": np.array(self.method),
+            "input_dimensions": np.array(self.input_dimensions),
+            "dimensions": np.array(self.dimensions),
+        }
+        if self.mean is not None:
+            arrays["mean"] = self.mean
+        if self.components is not None:
+            arrays["components"] = self.components
+        with open(path, "wb") as file:
+            np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(
+                str(arrays["method"]),
+                int(arrays["input_dimensions"]),
+                int(arrays["dimensions"]),
+                arrays["mean"] if "mean" in arrays else None,
+                arrays["components"] if "components" in arrays else None,
+            )
+
+
+class ReducedEmbeddings(Embeddings):
+    # Wraps an embedding model so that the vector store receives reduced vectors
+    # for both the corpus and the queries.
+    def __init__(self, embedding_model, reducer):
+        self.embedding_model = embedding_model
+        self.reducer = reducer
+
+    def embed_documents(self, texts):
+        vectors = self.embedding_model.embed_documents(texts)
+        return self.reducer.transform(vectors).tolist()
+
+    def embed_query(self, text):
+        vector = self.embedding_model.embed_query(text)
+        return self.reducer.transform([vector])[0].tolist()
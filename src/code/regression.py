@@ -0,0 +1,327 @@
+import json
+import os
+import re
+import sys
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+# Add the src directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.code.bm25_index import tokenize
+from src.code.load_test import percentiles
+from src.code.local_index import IVFIndex, top_k_tiled
+from src.code.normalization import normalize_profile
+from src.code.sample_queries import SAMPLE_QUERIES
+from src.code.serialization import serialize_document
+from src.code.synthetic_data import generate_documents
+
+load_dotenv()
+
+# Regression Constants
+# The corpus is a fixed set of synthetic profiles run through the same
+# normalization and serialization as ingest. REGRESSION_EMBEDDING_MODEL is
+# "hashed" (content-based hashed TF-IDF vectors, runs offline) or a model of
+# embedders.py.
+REGRESSION_CORPUS_SIZE = int(os.environ.get("REGRESSION_CORPUS_SIZE", 10000))
+REGRESSION_SEED = int(os.environ.get("REGRESSION_SEED", 0))
+REGRESSION_EMBEDDING_MODEL = os.environ.get("REGRESSION_EMBEDDING_MODEL", "hashed")
+REGRESSION_DIMENSIONS = int(os.environ.get("REGRESSION_DIMENSIONS", 768))
+REGRESSION_QUERIES_PATH = os.environ.get("REGRESSION_QUERIES_PATH")
+REGRESSION_K = int(os.environ.get("REGRESSION_K", 10))
+# REGRESSION_BACKEND is "exact" (tiled brute force) or "ivf" (approximate)
+REGRESSION_BACKEND = os.environ.get("REGRESSION_BACKEND", "exact")
+REGRESSION_NLIST = int(os.environ.get("REGRESSION_NLIST", 100))
+REGRESSION_NPROBE = int(os.environ.get("REGRESSION_NPROBE", 10))
+# Latency is measured after REGRESSION_WARMUP_ROUNDS untimed passes over the
+# queries, in REGRESSION_LATENCY_ROUNDS rounds of REGRESSION_LATENCY_REPEATS
+# searches per query. The median of the per-round percentiles is reported.
+REGRESSION_WARMUP_ROUNDS = int(os.environ.get("REGRESSION_WARMUP_ROUNDS", 2))
+REGRESSION_LATENCY_ROUNDS = int(os.environ.get("REGRESSION_LATENCY_ROUNDS", 5))
+REGRESSION_LATENCY_REPEATS = int(os.environ.get("REGRESSION_LATENCY_REPEATS", 20))
+REGRESSION_GOLDEN_PATH = os.environ.get(
+    "REGRESSION_GOLDEN_PATH", "data/regression_golden.json"
+)
+REGRESSION_REPORT_PATH = os.environ.get(
+    "REGRESSION_REPORT_PATH", "data/regression_report.json"
+)
+# Discards the golden results of every backend and records them from this run
+REGRESSION_UPDATE_GOLDEN = os.environ.get("REGRESSION_UPDATE_GOLDEN") == "true"
+
+# Thresholds
+REGRESSION_MIN_OVERLAP = float(os.environ.get("REGRESSION_MIN_OVERLAP", 0.9))
+REGRESSION_MIN_NDCG = float(os.environ.get("REGRESSION_MIN_NDCG", 0.9))
+# The p99 regresses only when it exceeds the baseline by both the ratio and the
+# slack, so sub-millisecond baselines are not failed by scheduler noise.
+REGRESSION_MAX_P99_RATIO = float(os.environ.get("REGRESSION_MAX_P99_RATIO", 1.5))
+REGRESSION_P99_SLACK_MS = float(os.environ.get("REGRESSION_P99_SLACK_MS", 2.0))
+REGRESSION_MAX_P99_MS = float(os.environ.get("REGRESSION_MAX_P99_MS", "inf"))
+
+
+# Keys of the serialized profiles, such as "user_skills_0_skill_name:"
+KEY_PATTERN = re.compile(r"\b\w+:(?=\s|$)")
+
+
+class HashedEmbeddings(Embeddings):
+    # Offline stand-in for an embedding model. The value words of a text are
+    # weighted by sublinear term frequency and by an IDF fitted on the corpus,
+    # then hashed into signed dimensions. Texts with the same words get the same
+    # vector and texts sharing rare words get similar ones, so formatting
+    # changes do not move results while content changes do.
+    def __init__(self, size):
+        self.size = size
+        self.idf = {}
+        self.default_idf = 1.0
+
+    def fit(self, texts):
+        counts = Counter()
+        for text in texts:
+            counts.update(set(self.tokens(text)))
+        self.idf = {
+            token: np.log((1 + len(texts)) / (1 + count)) + 1
+            for token, count in counts.items()
+        }
+        self.default_idf = np.log(1 + len(texts)) + 1
+        return self
+
+    def tokens(self, text):
+        return tokenize(KEY_PATTERN.sub(" ", text))
+
+    def embed(self, text):
+        vector = np.zeros(self.size, dtype=np.float32)
+        for token, count in Counter(self.tokens(text)).items():
+            digest = zlib.crc32(token.encode("utf-8"))
+            weight = (1 + np.log(count)) * self.idf.get(token, self.default_idf)
+            vector[(digest >> 1) % self.size] += weight if digest & 1 else -weight
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed(text)
+
+
+def get_regression_embedding_model():
+    if REGRESSION_EMBEDDING_MODEL == "hashed":
+        return HashedEmbeddings(REGRESSION_DIMENSIONS)
+    # NOTE : embedders.py needs the Vertex AI client, so it is only imported when
+    # a real model is requested.
+    from src.code.embedders import get_embedding_model
+
+    return get_embedding_model(REGRESSION_EMBEDDING_MODEL)
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def build_corpus(embedding_model):
+    documents = [
+        normalize_profile(document)
+        for document in generate_documents(REGRESSION_CORPUS_SIZE, REGRESSION_SEED)
+    ]
+    user_ids = [document["user_id"] for document in documents]
+    texts = [serialize_document(document) for document in documents]
+    if isinstance(embedding_model, HashedEmbeddings):
+        embedding_model.fit(texts)
+    vectors = []
+    for i in range(0, len(texts), 250):
+        vectors.extend(embedding_model.embed_documents(texts[i : i + 250]))
+    return user_ids, normalize_rows(vectors)
+
+
+def get_backend(name, corpus):
+    if name == "exact":
+        return lambda queries, k: next(top_k_tiled(queries, corpus, k))[1:]
+    if name == "ivf":
+        index = IVFIndex.build(corpus, REGRESSION_NLIST, seed=REGRESSION_SEED)
+        return lambda queries, k: index.search(queries, corpus, k, REGRESSION_NPROBE)
+    raise ValueError(f"Unknown regression backend: {name}")
+
+
+def run_queries(search, user_ids, query_vectors, k):
+    # Only the index lookup is timed, the query embedding is computed up front
+    for _ in range(REGRESSION_WARMUP_ROUNDS):
+        for vector in query_vectors:
+            search(vector[None], k)
+
+    rounds = []
+    for _ in range(REGRESSION_LATENCY_ROUNDS):
+        latencies = []
+        for vector in query_vectors:
+            for _ in range(REGRESSION_LATENCY_REPEATS):
+                start = time.perf_counter()
+                search(vector[None], k)
+                latencies.append(time.perf_counter() - start)
+        rounds.append(percentiles(latencies))
+    latency = {key: float(np.median([row[key] for row in rounds])) for key in rounds[0]}
+
+    results = []
+    for vector in query_vectors:
+        ids, scores = search(vector[None], k)
+        results.append(
+            [
+                {"user_id": user_ids[i], "score": float(score)}
+                for i, score in zip(ids[0], scores[0])
+                if i >= 0
+            ]
+        )
+    return results, latency
+
+
+def overlap_at_k(expected, actual, k):
+    return len(set(expected[:k]) & set(actual[:k])) / max(min(k, len(expected)), 1)
+
+
+def ndcg_at_k(expected, actual, k):
+    # Graded relevance from the golden ranking: the first golden result is worth
+    # k, the last one 1, and anything outside the golden top-k nothing.
+    relevance = {user_id: k - rank for rank, user_id in enumerate(expected[:k])}
+    dcg = sum(
+        relevance.get(user_id, 0) / np.log2(rank + 2)
+        for rank, user_id in enumerate(actual[:k])
+    )
+    ideal = sum(
+        relevance[user_id] / np.log2(rank + 2)
+        for rank, user_id in enumerate(expected[:k])
+    )
+    return float(dcg / ideal) if ideal else 1.0
+
+
+def compare(golden, results, queries, k):
+    rows = []
+    for query, result in zip(queries, results):
+        expected = [match["user_id"] for match in golden["results"].get(query, [])]
+        actual = [match["user_id"] for match in result]
+        rows.append(
+            {
+                "query": query,
+                "overlap_at_k": overlap_at_k(expected, actual, k),
+                "ndcg_at_k": ndcg_at_k(expected, actual, k),
+            }
+        )
+    return rows
+
+
+def check_thresholds(summary, baseline):
+    failures = []
+    if summary["overlap_at_k"] < REGRESSION_MIN_OVERLAP:
+        failures.append(
+            f"overlap@k {summary['overlap_at_k']:.3f} < {REGRESSION_MIN_OVERLAP}"
+        )
+    if summary["ndcg_at_k"] < REGRESSION_MIN_NDCG:
+        failures.append(f"ndcg@k {summary['ndcg_at_k']:.3f} < {REGRESSION_MIN_NDCG}")
+    p99 = summary["latency"]["p99_ms"]
+    if p99 > REGRESSION_MAX_P99_MS:
+        failures.append(f"p99 {p99:.2f} ms > {REGRESSION_MAX_P99_MS} ms")
+    limit = max(
+        baseline["p99_ms"] * REGRESSION_MAX_P99_RATIO,
+        baseline["p99_ms"] + REGRESSION_P99_SLACK_MS,
+    )
+    if p99 > limit:
+        failures.append(
+            f"p99 {p99:.2f} ms > {limit:.2f} ms (baseline {baseline['p99_ms']:.2f} ms)"
+        )
+    return failures
+
+
+def backend_params(name):
+    if name == "ivf":
+        return {"nlist": REGRESSION_NLIST, "nprobe": REGRESSION_NPROBE}
+    return {}
+
+
+def load_golden(config):
+    if not os.path.exists(REGRESSION_GOLDEN_PATH):
+        return {"config": config, "backends": {}}
+    with open(REGRESSION_GOLDEN_PATH, "r") as file:
+        golden = json.load(file)
+    if golden["config"] != config:
+        raise ValueError(
+            f"{REGRESSION_GOLDEN_PATH} was recorded with {golden['config']}, "
+            "set REGRESSION_UPDATE_GOLDEN=true to re-record it"
+        )
+    return golden
+
+
+def save_golden(golden):
+    with open(f"{REGRESSION_GOLDEN_PATH}.tmp", "w") as file:
+        file.write(json.dumps(golden, indent=2))
+    os.replace(f"{REGRESSION_GOLDEN_PATH}.tmp", REGRESSION_GOLDEN_PATH)
+
+
+def main():
+    queries = SAMPLE_QUERIES
+    if REGRESSION_QUERIES_PATH:
+        with open(REGRESSION_QUERIES_PATH, "r") as file:
+            queries = json.load(file)
+
+    embedding_model = get_regression_embedding_model()
+    user_ids, corpus = build_corpus(embedding_model)
+    query_vectors = normalize_rows(
+        [embedding_model.embed_query(query) for query in queries]
+    )
+    config = {
+        "corpus_size": REGRESSION_CORPUS_SIZE,
+        "seed": REGRESSION_SEED,
+        "model": REGRESSION_EMBEDDING_MODEL,
+        "k": REGRESSION_K,
+    }
+
+    if REGRESSION_UPDATE_GOLDEN:
+        golden = {"config": config, "backends": {}}
+    else:
+        golden = load_golden(config)
+
+    results, latency = run_queries(
+        get_backend(REGRESSION_BACKEND, corpus), user_ids, query_vectors, REGRESSION_K
+    )
+    # Every backend has its own golden results, recorded on its first run, so
+    # drift measures what changed since then rather than the approximation error.
+    expected = golden["backends"].get(REGRESSION_BACKEND)
+    if expected is not None and expected["params"] != backend_params(
+        REGRESSION_BACKEND
+    ):
+        raise ValueError(
+            f"The {REGRESSION_BACKEND} golden results were recorded with "
+            f"{expected['params']}, set REGRESSION_UPDATE_GOLDEN=true to re-record them"
+        )
+    if expected is None:
+        expected = {
+            "params": backend_params(REGRESSION_BACKEND),
+            "results": dict(zip(queries, results)),
+            "latency": latency,
+        }
+        golden["backends"][REGRESSION_BACKEND] = expected
+        save_golden(golden)
+        print(
+            f"Recorded {REGRESSION_BACKEND} golden results in {REGRESSION_GOLDEN_PATH}"
+        )
+
+    rows = compare(expected, results, queries, REGRESSION_K)
+    summary = {
+        "backend": REGRESSION_BACKEND,
+        "overlap_at_k": float(np.mean([row["overlap_at_k"] for row in rows])),
+        "ndcg_at_k": float(np.mean([row["ndcg_at_k"] for row in rows])),
+        "latency": latency,
+    }
+    baseline = expected["latency"]
+    failures = check_thresholds(summary, baseline)
+
+    report = {**summary, "baseline_latency": baseline, "failures": failures}
+    with open(REGRESSION_REPORT_PATH, "w") as file:
+        file.write(json.dumps({**report, "queries": rows}, indent=2))
+    print(json.dumps(report, indent=2))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PARQUET_SCHEMA = pa.schema(
+    [
+        ("query", pa.string()),
+        ("cursor", pa.string()),
+        ("next_cursor", pa.string()),
+        ("rank", pa.int32()),
+        ("user_id", pa.string()),
+        ("score", pa.float64()),
+        ("profile", pa.string()),
+    ]
+)
+
+
+class JsonlResultSink:
+    def __init__(self, path):
+        self.file = open(path, "w")
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ParquetResultSink:
+    # Matches are buffered and written one row group at a time, so memory is
+    # bounded by row_group_size rather than by the size of the run.
+    def __init__(self, path, row_group_size=10000):
+        self.writer = pq.ParquetWriter(path, PARQUET_SCHEMA)
+        self.row_group_size = row_group_size
+        self.rows = []
+
+    def write(self, record):
+        if not record["result"]:
+            # Keeps queries without matches, like the JSONL output does
+            self.rows.append(
+                {
+                    "query": record["query"],
+                    "cursor": record["cursor"],
+                    "next_cursor": record["next_cursor"],
+                    "rank": None,
+                    "user_id": None,
+                    "score": None,
+                    "profile": None,
+                }
+            )
+        for rank, match in enumerate(record["result"]):
+            self.rows.append(
+                {
+                    "query": record["query"],
+                    "cursor": record["cursor"],
+                    "next_cursor": record["next_cursor"],
+                    "rank": rank,
+                    "user_id": match["user_id"],
+                    "score": match["score"],
+                    "profile": json.dumps(match.get("profile")),
+                }
+            )
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.writer.write_table(
+                pa.Table.from_pylist(self.rows, schema=PARQUET_SCHEMA)
+            )
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_result_sink(path):
+    if path.endswith(".parquet"):
+        return ParquetResultSink(path)
+    if path.endswith(".jsonl"):
+        return JsonlResultSink(path)
+    raise ValueError(f"Unsupported results file: {path}")
@@ -0,0 +1,13 @@
+# Sample job descriptions searched by search_vectorstore.py and regression.py
+SAMPLE_QUERIES = [
+    "Seeking an experienced Secondary Mathematics Teacher with a B.Ed or M.Sc in Mathematics, 5+ years of teaching experience, ideally in an IB curriculum. Strong skills in problem-solving, adaptability, and leadership required. Must be available for an immediate start.",
+    "Looking for a Primary School Teacher specializing in English Literature, holding a B.A or M.A in English, with at least 2 years of classroom experience. The candidate should have excellent communication skills, a passion for literature, and the ability to engage students creatively.",
+    "Hiring a Secondary Physics Teacher with a minimum of 4 years of experience teaching in a British or American curriculum, holding a B.Sc or M.Sc in Physics. Must be available by June 2025 and demonstrate skills in classroom management, innovation, and student mentorship.",
+    "In need of a Middle School Science Teacher with a degree in Biology or General Science, along with relevant certifications such as a UK Level 5 Diploma. A minimum of 3 years of teaching experience is required, along with strong collaboration, lesson planning, and communication skills.",
+    "Looking for a Spanish Language Teacher with native proficiency in Spanish and at least a B.Ed in Modern Languages. Candidates must have 2+ years of experience teaching in international schools and possess excellent organizational, communication, and language teaching skills.",
+    "Seeking a Secondary School Art Teacher with a B.A or M.A in Fine Arts, and 3+ years of teaching experience in creative subjects. Strong skills in mentoring, classroom creativity, and the ability to inspire students through hands-on projects are required. Candidates with experience in international curricula are preferred.",
+    "Looking for a Secondary Computer Science Teacher with a B.Tech or M.Sc in Computer Science, 3+ years of experience in coding and programming education. Candidates must be fluent in English, demonstrate problem-solving skills, and have experience with project-based learning.",
+    "Seeking a Physical Education Teacher for a secondary school with a B.Sc in Physical Education, 5+ years of experience in physical education instruction, and strong skills in teamwork, motivation, and student engagement. Certifications in fitness training or coaching are preferred.",
+    "Hiring a Chemistry Teacher with a B.Sc in Chemistry or a related science, with at least 4 years of teaching experience. Experience in an international school setting and the ability to lead lab work and student projects is required. Candidates should possess strong leadership and organizational skills.",
+    "Looking for a Geography Teacher with a B.A in Geography, 2+ years of experience teaching in an international curriculum, and strong skills in classroom management, interactive learning, and student engagement. Candidates with additional certifications in social sciences are preferred.",
+]
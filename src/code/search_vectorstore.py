@@ -1,11 +1,24 @@
+import base64
+import hashlib
 import json
 import os
 import re
+import sys
+from contextlib import closing
+from itertools import islice
 
 from dotenv import load_dotenv
 from google.cloud import aiplatform
 from google.oauth2 import service_account
-from langchain_google_vertexai import VectorSearchVectorStore, VertexAIEmbeddings
+
+# Add the src directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.code import doc_store
+from src.code.bm25_index import BM25Index
+from src.code.embedders import get_active_index, get_vector_store
+from src.code.result_sink import open_result_sink
+from src.code.sample_queries import SAMPLE_QUERIES
 
 load_dotenv()
 
@@ -15,17 +28,115 @@ REGION = os.environ["GCS_REGION"]
 BUCKET = os.environ["GCS_BUCKET"]
 BUCKET_URI = f"gs://{BUCKET}"
 CREDENTIALS = os.environ["GCS_CREDENTIAL_FILE"]
-INDEX_ID = os.environ["INDEX_ID"]
-INDEX_ENDPOINT_ID = os.environ["INDEX_ENDPOINT_ID"]
 
-# The number of dimensions for the textembedding-gecko@003 is 768
-# If other embedder is used, the dimensions would probably need to change.
-DIMENSIONS = os.environ["DIMENSIONS"]
+# Used until an index is registered by create_vector_index.py
+INDEX_ID = os.environ.get("INDEX_ID")
+INDEX_ENDPOINT_ID = os.environ.get("INDEX_ENDPOINT_ID")
 
 # Index Constants
 DISPLAY_NAME = os.environ["DISPLAY_NAME"]
 DEPLOYED_INDEX_ID = os.environ["DEPLOYED_INDEX_ID"]
 
+# Search Constants
+# SEARCH_MODE is either "vector" or "hybrid". Hybrid search fuses the vector
+# results with a local BM25 index built by add_datapoints.py.
+SEARCH_MODE = os.environ.get("SEARCH_MODE", "vector")
+BM25_INDEX_PATH = os.environ.get("BM25_INDEX_PATH", "data/bm25_index.pkl")
+HYBRID_FETCH_K = int(os.environ.get("HYBRID_FETCH_K", 20))
+HYBRID_VECTOR_WEIGHT = float(os.environ.get("HYBRID_VECTOR_WEIGHT", 1.0))
+HYBRID_LEXICAL_WEIGHT = float(os.environ.get("HYBRID_LEXICAL_WEIGHT", 1.0))
+RRF_K = 60
+
+# Result Export Constants
+# Results are streamed to JSONL or Parquet depending on the file extension.
+RESULTS_PATH = os.environ.get("RESULTS_PATH", "data/results.jsonl")
+QUERIES_PATH = os.environ.get("QUERIES_PATH")
+DOC_STORE_PATH = os.environ.get("DOC_STORE_PATH", "data/profiles.sqlite")
+ENRICH_FIELDS = os.environ.get(
+    "ENRICH_FIELDS", "user_profiles,user_qualifications,user_skills"
+).split(",")
+QUERY_BATCH_SIZE = int(os.environ.get("QUERY_BATCH_SIZE", 10))
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 5))
+RESULT_PAGES = int(os.environ.get("RESULT_PAGES", 1))
+# JSON object of query -> next_cursor from earlier results, to resume the queries
+# at the next page. Queries without a cursor start at the first page.
+CURSORS_PATH = os.environ.get("CURSORS_PATH")
+
+
+def vector_search(vector_store, query, k):
+    result = []
+    for document, score in vector_store.similarity_search_with_score(query, k=k):
+        user_id = re.search(r"user_id:\s([\w-]+)", document.page_content).group(1)
+        result.append((user_id, score))
+    return result
+
+
+def reciprocal_rank_fusion(rankings, weights, k=RRF_K):
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, user_id in enumerate(ranking):
+            scores[user_id] = scores.get(user_id, 0.0) + weight / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def hybrid_search(vector_store, bm25_index, query, k, fetch_k=HYBRID_FETCH_K):
+    fetch_k = max(fetch_k, k)
+    vector_results = vector_search(vector_store, query, fetch_k)
+    lexical_results = bm25_index.search(query, fetch_k)
+    fused = reciprocal_rank_fusion(
+        [
+            [user_id for user_id, _ in vector_results],
+            [user_id for user_id, _ in lexical_results],
+        ],
+        [HYBRID_VECTOR_WEIGHT, HYBRID_LEXICAL_WEIGHT],
+    )
+    return fused[:k]
+
+
+def encode_cursor(query, offset):
+    token = {"q": hashlib.sha1(query.encode("utf-8")).hexdigest()[:16], "o": offset}
+    return base64.urlsafe_b64encode(json.dumps(token).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(query, cursor):
+    if cursor is None:
+        return 0
+    token = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    if token["q"] != hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]:
+        raise ValueError("Cursor does not belong to this query")
+    return token["o"]
+
+
+def paginate(query, matches, page_size, offset=0):
+    for start in range(offset, max(len(matches), offset + 1), page_size):
+        end = start + page_size
+        next_cursor = encode_cursor(query, end) if end < len(matches) else None
+        yield encode_cursor(query, start), matches[start:end], next_cursor
+
+
+def search_pages(search, query, page_size, pages=1, cursor=None):
+    # The endpoint has no offset, so deep pages are served by fetching one extra
+    # match past the last page to know whether another page exists.
+    offset = decode_cursor(query, cursor)
+    matches = search(query, offset + page_size * pages + 1)
+    return list(islice(paginate(query, matches, page_size, offset), pages))
+
+
+def enrich_pages(conn, pages):
+    user_ids = [user_id for *_, matches, _ in pages for user_id, _ in matches]
+    profiles = doc_store.fetch_profiles(conn, user_ids, ENRICH_FIELDS)
+    for query, cursor, matches, next_cursor in pages:
+        result = [
+            {"user_id": user_id, "score": score, "profile": profiles.get(user_id)}
+            for user_id, score in matches
+        ]
+        yield {
+            "query": query,
+            "cursor": cursor,
+            "next_cursor": next_cursor,
+            "result": result,
+        }
+
 
 def main():
     with open(CREDENTIALS) as f:
@@ -41,45 +152,46 @@ def main():
         staging_bucket=BUCKET_URI,
         credentials=my_credentials,
     )
-    my_index = aiplatform.MatchingEngineIndex(INDEX_ID)
-    my_index_endpoint = aiplatform.MatchingEngineIndexEndpoint(INDEX_ENDPOINT_ID)
-    embedding_model = VertexAIEmbeddings(model_name="textembedding-gecko@003")
-
-    # Create a Vector Store
-    vector_store = VectorSearchVectorStore.from_components(
-        project_id=PROJECT_ID,
-        region=REGION,
-        gcs_bucket_name=BUCKET,
-        index_id=my_index.name,
-        endpoint_id=my_index_endpoint.name,
-        embedding=embedding_model,
-        stream_update=True,
-    )
-    queries = [
-        "Seeking an experienced Secondary Mathematics Teacher with a B.Ed or M.Sc in Mathematics, 5+ years of teaching experience, ideally in an IB curriculum. Strong skills in problem-solving, adaptability, and leadership required. Must be available for an immediate start.",
-        "Looking for a Primary School Teacher specializing in English Literature, holding a B.A or M.A in English, with at least 2 years of classroom experience. The candidate should have excellent communication skills, a passion for literature, and the ability to engage students creatively.",
-        "Hiring a Secondary Physics Teacher with a minimum of 4 years of experience teaching in a British or American curriculum, holding a B.Sc or M.Sc in Physics. Must be available by June 2025 and demonstrate skills in classroom management, innovation, and student mentorship.",
-        "In need of a Middle School Science Teacher with a degree in Biology or General Science, along with relevant certifications such as a UK Level 5 Diploma. A minimum of 3 years of teaching experience is required, along with strong collaboration, lesson planning, and communication skills.",
-        "Looking for a Spanish Language Teacher with native proficiency in Spanish and at least a B.Ed in Modern Languages. Candidates must have 2+ years of experience teaching in international schools and possess excellent organizational, communication, and language teaching skills.",
-        "Seeking a Secondary School Art Teacher with a B.A or M.A in Fine Arts, and 3+ years of teaching experience in creative subjects. Strong skills in mentoring, classroom creativity, and the ability to inspire students through hands-on projects are required. Candidates with experience in international curricula are preferred.",
-        "Looking for a Secondary Computer Science Teacher with a B.Tech or M.Sc in Computer Science, 3+ years of experience in coding and programming education. Candidates must be fluent in English, demonstrate problem-solving skills, and have experience with project-based learning.",
-        "Seeking a Physical Education Teacher for a secondary school with a B.Sc in Physical Education, 5+ years of experience in physical education instruction, and strong skills in teamwork, motivation, and student engagement. Certifications in fitness training or coaching are preferred.",
-        "Hiring a Chemistry Teacher with a B.Sc in Chemistry or a related science, with at least 4 years of teaching experience. Experience in an international school setting and the ability to lead lab work and student projects is required. Candidates should possess strong leadership and organizational skills.",
-        "Looking for a Geography Teacher with a B.A in Geography, 2+ years of experience teaching in an international curriculum, and strong skills in classroom management, interactive learning, and student engagement. Candidates with additional certifications in social sciences are preferred.",
-    ]
-    result_dict = []
-    for query in queries:
-        vector_results = vector_store.similarity_search_with_score(query, k=5)
-        result = []
-        for vector_result in vector_results:
-            user_id = re.search(
-                r"user_id:\s([\w-]+)", vector_result[0].page_content
-            ).group(1)
-            result.append({user_id: vector_result[1]})
-        result_dict.append({"query": query, "result": result})
-
-    with open(f"data/results.json", "w") as file:
-        file.writelines(json.dumps(result_dict))
+    # Queries and documents are embedded with the model of the active index
+    index = get_active_index(INDEX_ID, INDEX_ENDPOINT_ID)
+    vector_store = get_vector_store(index, PROJECT_ID, REGION, BUCKET)
+    queries = SAMPLE_QUERIES
+    if QUERIES_PATH:
+        with open(QUERIES_PATH, "r") as file:
+            queries = json.load(file)
+    cursors = {}
+    if CURSORS_PATH:
+        with open(CURSORS_PATH, "r") as file:
+            cursors = json.load(file)
+
+    if SEARCH_MODE == "hybrid":
+        bm25_index = BM25Index.load(BM25_INDEX_PATH)
+
+        def search(query, k):
+            return hybrid_search(vector_store, bm25_index, query, k)
+
+    elif SEARCH_MODE == "vector":
+
+        def search(query, k):
+            return vector_search(vector_store, query, k)
+
+    else:
+        raise ValueError(f"Unknown SEARCH_MODE: {SEARCH_MODE}")
+
+    # NOTE : Every page of a query is fetched with a single search call, and the
+    # profiles of all matches in a query batch are looked up together.
+    with open_result_sink(RESULTS_PATH) as sink, closing(
+        doc_store.connect(DOC_STORE_PATH)
+    ) as conn:
+        for i in range(0, len(queries), QUERY_BATCH_SIZE):
+            pages = []
+            for query in queries[i : i + QUERY_BATCH_SIZE]:
+                for cursor, page, next_cursor in search_pages(
+                    search, query, PAGE_SIZE, RESULT_PAGES, cursors.get(query)
+                ):
+                    pages.append((query, cursor, page, next_cursor))
+            for record in enrich_pages(conn, pages):
+                sink.write(record)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,18 @@
+def flatten_json(data, parent_key="", sep="_"):
+    items = []
+    for k, v in data.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        if isinstance(v, dict):
+            items.extend(flatten_json(v, new_key, sep=sep).items())
+        elif isinstance(v, list):
+            for i, item in enumerate(v):
+                items.extend(
+                    flatten_json({f"{new_key}{sep}{i}": item}, "", sep=sep).items()
+                )
+        else:
+            items.append((new_key, v))
+    return dict(items)
+
+
+def serialize_document(data):
+    return " ".join(f"{key}: {value}" for key, value in flatten_json(data).items())
@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# Add the src directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.code.add_datapoints import UPSERT_BATCH_SIZE, chunking, iter_partitions
+from src.code.create_vector_index import (
+    BUCKET,
+    DEPLOYED_INDEX_ID,
+    DISPLAY_NAME,
+    PROJECT_ID,
+    REGION,
+    create_index,
+    init_aiplatform,
+)
+from src.code.embedders import (
+    activate_index,
+    get_active_index,
+    get_embedder,
+    get_vector_store,
+    load_registry,
+)
+from src.code.ingest_plan import datapoint_id
+from src.code.reduction import Reducer
+from src.code.load_test import percentiles
+from src.code.search_vectorstore import INDEX_ENDPOINT_ID, INDEX_ID, vector_search
+
+load_dotenv()
+
+# Shadow Index Constants
+SHADOW_EMBEDDING_MODEL = os.environ["SHADOW_EMBEDDING_MODEL"]
+SHADOW_REDUCTION_PATH = os.environ.get("SHADOW_REDUCTION_PATH")
+SHADOW_DIMENSIONS = int(
+    os.environ.get(
+        "SHADOW_DIMENSIONS",
+        (
+            Reducer.load(SHADOW_REDUCTION_PATH).dimensions
+            if SHADOW_REDUCTION_PATH
+            else get_embedder(SHADOW_EMBEDDING_MODEL)["dimensions"]
+        ),
+    )
+)
+SHADOW_DISPLAY_NAME = os.environ.get("SHADOW_DISPLAY_NAME", f"{DISPLAY_NAME}-shadow")
+SHADOW_DEPLOYED_INDEX_ID = os.environ.get(
+    "SHADOW_DEPLOYED_INDEX_ID", f"{DEPLOYED_INDEX_ID}_shadow"
+)
+# Set to reuse a shadow index that was already built and ingested
+SHADOW_INDEX_ID = os.environ.get("SHADOW_INDEX_ID")
+SHADOW_QUERIES_PATH = os.environ["SHADOW_QUERIES_PATH"]
+SHADOW_REPORT_PATH = os.environ.get("SHADOW_REPORT_PATH", "data/shadow_report.json")
+SHADOW_K = int(os.environ.get("SHADOW_K", 10))
+SHADOW_MIN_RECALL = float(os.environ.get("SHADOW_MIN_RECALL", 0.9))
+SHADOW_MAX_P99_MS = float(os.environ.get("SHADOW_MAX_P99_MS", "inf"))
+SHADOW_SWITCH = os.environ.get("SHADOW_SWITCH") == "true"
+
+
+def build_shadow_index():
+    if SHADOW_INDEX_ID:
+        return load_registry()["indexes"][SHADOW_INDEX_ID]
+
+    shadow = create_index(
+        SHADOW_DISPLAY_NAME,
+        SHADOW_DEPLOYED_INDEX_ID,
+        SHADOW_EMBEDDING_MODEL,
+        SHADOW_DIMENSIONS,
+        activate=False,
+        reduction=SHADOW_REDUCTION_PATH,
+    )
+    # Datapoint ids are deterministic, so the ingest manifest of the active
+    # index stays valid for the shadow index once it is switched to.
+    vector_store = get_vector_store(shadow, PROJECT_ID, REGION, BUCKET)
+    for user_ids, serialized_data, *_ in iter_partitions():
+        for batch in chunking(list(zip(user_ids, serialized_data)), UPSERT_BATCH_SIZE):
+            vector_store.add_texts(
+                texts=[text for _, text in batch],
+                ids=[datapoint_id(user_id) for user_id, _ in batch],
+                is_complete_overwrite=False,
+            )
+    return shadow
+
+
+def timed_search(vector_store, query, k):
+    start = time.perf_counter()
+    result = vector_search(vector_store, query, k)
+    return [user_id for user_id, _ in result], time.perf_counter() - start
+
+
+def compare(active_store, shadow_store, queries, k):
+    # The active index is the reference, so recall is the share of its top-k
+    # that the shadow index also returns.
+    recalls, active_latencies, shadow_latencies = [], [], []
+    for query in queries:
+        active_ids, active_latency = timed_search(active_store, query, k)
+        shadow_ids, shadow_latency = timed_search(shadow_store, query, k)
+        if active_ids:
+            recalls.append(len(set(active_ids) & set(shadow_ids)) / len(active_ids))
+        active_latencies.append(active_latency)
+        shadow_latencies.append(shadow_latency)
+    return {
+        "k": k,
+        "queries": len(queries),
+        "recall_at_k": sum(recalls) / len(recalls) if recalls else 0.0,
+        "active": percentiles(active_latencies),
+        "shadow": percentiles(shadow_latencies),
+    }
+
+
+def main():
+    init_aiplatform()
+    active = get_active_index(INDEX_ID, INDEX_ENDPOINT_ID)
+    shadow = build_shadow_index()
+
+    with open(SHADOW_QUERIES_PATH, "r") as file:
+        queries = json.load(file)
+    report = compare(
+        get_vector_store(active, PROJECT_ID, REGION, BUCKET),
+        get_vector_store(shadow, PROJECT_ID, REGION, BUCKET),
+        queries,
+        SHADOW_K,
+    )
+    report["active_index"] = active
+    report["shadow_index"] = shadow
+    report["passed"] = (
+        report["recall_at_k"] >= SHADOW_MIN_RECALL
+        and report["shadow"]["p99_ms"] <= SHADOW_MAX_P99_MS
+    )
+    with open(SHADOW_REPORT_PATH, "w") as file:
+        file.write(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+
+    # NOTE : Readers pick up the active index from the registry when they start,
+    # so switching is a single atomic registry write.
+    if SHADOW_SWITCH and report["passed"]:
+        activate_index(shadow["index_id"])
+        print(f"Switched active index to {shadow['index_id']}")
+
+
+if __name__ == "__main__":
+    main()
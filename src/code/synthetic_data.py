@@ -0,0 +1,714 @@
+import csv
+import io
+import json
+import os
+import random
+import sys
+import uuid
+from datetime import date, timedelta
+
+from dotenv import load_dotenv
+
+# Add the src directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.code.db import Database
+
+load_dotenv()
+
+# Synthetic Data Constants
+SYNTHETIC_USERS = int(os.environ.get("SYNTHETIC_USERS", 10000))
+SYNTHETIC_SEED = int(os.environ.get("SYNTHETIC_SEED", 0))
+SYNTHETIC_OUTPUT = os.environ.get("SYNTHETIC_OUTPUT", "data/synthetic_data.json")
+SYNTHETIC_SEED_POSTGRES = os.environ.get("SYNTHETIC_SEED_POSTGRES") == "true"
+SYNTHETIC_CHUNK_SIZE = int(os.environ.get("SYNTHETIC_CHUNK_SIZE", 10000))
+
+GRAVITY_NAMESPACE = uuid.UUID("0d6b8c3e-2f4a-4b7e-9c1d-5a8e7f3b2c10")
+
+# Gravity lookup tables, keyed by table name
+GRAVITY = {
+    "countries": [
+        "India",
+        "United Arab Emirates",
+        "United Kingdom",
+        "United States",
+        "Saudi Arabia",
+        "Qatar",
+        "Singapore",
+        "Kenya",
+    ],
+    "states": [
+        "Delhi",
+        "Maharashtra",
+        "Karnataka",
+        "Dubai",
+        "Abu Dhabi",
+        "England",
+        "California",
+        "Riyadh",
+        "Doha",
+        "Nairobi",
+    ],
+    "languages": ["English", "Hindi", "Arabic", "Spanish", "French", "Tamil"],
+    "subjects": [
+        "Mathematics",
+        "Physics",
+        "Chemistry",
+        "Biology",
+        "English Literature",
+        "Computer Science",
+        "Geography",
+        "History",
+        "Physical Education",
+        "Fine Arts",
+        "Spanish",
+        "General Science",
+    ],
+    "currencies": ["INR", "AED", "GBP", "USD", "SAR", "QAR"],
+    "curriculum": ["IB", "CBSE", "ICSE", "British", "American", "Cambridge IGCSE"],
+    "teaching_levels": [
+        "Pre-Primary",
+        "Primary",
+        "Middle School",
+        "Secondary",
+        "Senior Secondary",
+    ],
+    "teaching_roles": [
+        "Subject Teacher",
+        "Class Teacher",
+        "Head of Department",
+        "Coordinator",
+        "Principal",
+    ],
+    "qualification_fields": [
+        "Education",
+        "Mathematics",
+        "Physics",
+        "English",
+        "Computer Science",
+        "Chemistry",
+        "Fine Arts",
+    ],
+    "qualification_levels": [
+        "Diploma",
+        "Bachelors",
+        "Masters",
+        "Doctorate",
+        "UK Level 5 Diploma",
+    ],
+}
+
+MODE_OF_LEARNING = {1: "ONLINE", 2: "CLASSROOM", 3: "BLENDED", 4: "DEFAULT"}
+STATUS = {1: "IN_PROGRESS", 2: "COMPLETED", 3: "SUSPENDED"}
+PROFICIENCY = {
+    1: "ELEMENTARY",
+    2: "LIMITED_WORKING",
+    3: "PROFESSIONAL_WORKING",
+    4: "FULL_PROFESSIONAL",
+    5: "NATIVE",
+}
+GENDER = {1: "MALE", 2: "FEMALE", 3: "PREFER_NOT_TO_SAY"}
+EMPLOYMENT_TYPE = {
+    1: "FULL_TIME",
+    2: "PART_TIME",
+    3: "FRESHER",
+    4: "INTERN",
+    5: "FREELANCE",
+    6: "SELF_EMPLOYED",
+}
+ORGANISATION_TYPE = {1: "SCHOOL", 2: "COLLEGE_OR_UNIVERSITY", 3: "TUTORING"}
+
+DEGREES = ["B.Ed", "M.Ed", "B.Sc", "M.Sc", "B.A", "M.A", "B.Tech", "PhD"]
+ORGANISATIONS = [
+    "Delhi Public School",
+    "GEMS Modern Academy",
+    "Oakridge International School",
+    "University of Mumbai",
+    "Suraasa",
+    "Cambridge Assessment",
+    "British Council",
+    "Kings College London",
+]
+SKILLS = [
+    "Classroom Management",
+    "Lesson Planning",
+    "Communication",
+    "Problem Solving",
+    "Leadership",
+    "Mentoring",
+    "Project Based Learning",
+    "Differentiated Instruction",
+    "Assessment Design",
+    "Teamwork",
+]
+INTERESTS = ["Reading", "Robotics", "Music", "Travel", "Debate", "Sports", "Coding"]
+TESTS = ["IELTS", "TOEFL", "CTET", "PTE", "GRE"]
+SENTENCES = [
+    "Taught {subject} to {level} students following the {curriculum} curriculum.",
+    "Designed lesson plans and assessments for {subject}.",
+    "Mentored students preparing for board examinations in {subject}.",
+    "Led the {subject} department and coordinated inter-school activities.",
+    "Introduced project based learning and hands-on lab work in {subject}.",
+    "Organised parent teacher meetings and tracked student progress.",
+]
+
+# Relational columns of every seeded table, in COPY order
+SOLIS_TABLES = {
+    "users": "id bigint, uuid uuid, is_active boolean, deleted_at timestamp",
+    "learning_accounts": "id bigint, base_user_id bigint, deleted_at timestamp",
+    "preferred_work_locations": "learning_user_id bigint, country_id uuid, "
+    "state_id uuid, sequence integer, deleted_at timestamp",
+    "user_awards": "learning_user_id bigint, title text, issuer text, "
+    "issued_on date, description text, certificate text, certificate_name text, "
+    "deleted_at timestamp",
+    "user_certifications": "id bigint, learning_user_id bigint, name text, "
+    "organisation_name text, will_expire boolean, completion_date date, "
+    "expiration_date date, mode_of_learning integer, "
+    "suraasa_certification_id text, status integer, deleted_at timestamp",
+    "user_certification_evidences": "user_certification_id bigint, "
+    "deleted_at timestamp",
+    "user_computed_fields": "learning_user_id bigint, days_of_experience integer, "
+    "deleted_at timestamp",
+    "user_interests": "learning_user_id bigint, interest text, deleted_at timestamp",
+    "user_languages": "learning_user_id bigint, language_id uuid, "
+    "proficiency integer, deleted_at timestamp",
+    "user_profiles": "learning_user_id bigint, date_of_birth date, gender integer, "
+    "country_id uuid, state_id uuid, is_verified boolean, "
+    "looking_for_jobs boolean, career_aspiration text, deleted_at timestamp",
+    "user_projects": "learning_user_id bigint, title text, "
+    "currently_working boolean, start_date date, end_date date, url text, "
+    "description text, deleted_at timestamp",
+    "user_publications": "learning_user_id bigint, title text, publisher text, "
+    "published_on date, url text, description text, deleted_at timestamp",
+    "user_qualifications": "id bigint, learning_user_id bigint, "
+    "organisation_name text, name text, qualification_field_id uuid, "
+    "start_date date, end_date date, grade text, mode_of_learning integer, "
+    "suraasa_qualification_id text, status integer, qualification_level_id uuid, "
+    "deleted_at timestamp",
+    "user_qualification_evidences": "user_qualification_id bigint, "
+    "deleted_at timestamp",
+    "user_skills": "learning_account_id bigint, skill_name text, sequence integer, "
+    "deleted_at timestamp",
+    "user_subject_experiences": "learning_user_id bigint, subject_id uuid, "
+    "days_of_experience integer, deleted_at timestamp",
+    "user_subject_interests": "learning_user_id bigint, subject_id uuid, "
+    "sequence integer, deleted_at timestamp",
+    "user_test_scores": "learning_user_id bigint, name text, score text, "
+    "test_date date, description text, evidence_document text, "
+    "evidence_url text, deleted_at timestamp",
+    "user_work_experiences": "id bigint, learning_user_id bigint, title text, "
+    "employment_type integer, description text, organisation_name text, "
+    "organisation_type integer, other_organisation_type text, country_id uuid, "
+    "state_id uuid, currently_working boolean, start_date date, end_date date, "
+    "salary text, currency_id uuid, curriculum_id uuid, teaching_level_id uuid, "
+    "teaching_role_id uuid, deleted_at timestamp",
+    "work_experience_subjects": "work_experience_id bigint, subject_id uuid, "
+    "deleted_at timestamp",
+}
+
+
+def gravity_uuid(table, name):
+    return str(uuid.uuid5(GRAVITY_NAMESPACE, f"{table}/{name}"))
+
+
+def random_date(rng, start_year=1995, end_year=2024):
+    start = date(start_year, 1, 1)
+    days = (date(end_year, 12, 31) - start).days
+    return start + timedelta(days=rng.randrange(days))
+
+
+def format_date(value):
+    return value.strftime("%Y-%m-%d") if value else ""
+
+
+def description(rng, subject, sentences=3):
+    context = {
+        "subject": subject,
+        "level": rng.choice(GRAVITY["teaching_levels"]).lower(),
+        "curriculum": rng.choice(GRAVITY["curriculum"]),
+    }
+    return " ".join(
+        rng.choice(SENTENCES).format(**context)
+        for _ in range(rng.randint(1, sentences))
+    )
+
+
+def generate_user(seed, index):
+    # Every user has its own generator, so any range of users can be produced
+    # independently and always yields the same rows.
+    rng = random.Random((seed << 40) | index)
+    account_id = index + 1
+    subjects = rng.sample(GRAVITY["subjects"], rng.randint(1, 3))
+    rows = {table: [] for table in SOLIS_TABLES}
+    user_uuid = uuid.UUID(int=rng.getrandbits(128), version=4)
+    rows["users"].append([account_id, str(user_uuid)])
+    rows["learning_accounts"].append([account_id, account_id])
+
+    for sequence in range(rng.randint(0, 3)):
+        rows["preferred_work_locations"].append(
+            [
+                account_id,
+                gravity_uuid("countries", rng.choice(GRAVITY["countries"])),
+                gravity_uuid("states", rng.choice(GRAVITY["states"])),
+                sequence + 1,
+            ]
+        )
+
+    for _ in range(rng.choice([0, 0, 0, 1, 2])):
+        rows["user_awards"].append(
+            [
+                account_id,
+                f"Best {rng.choice(subjects)} Teacher",
+                rng.choice(ORGANISATIONS),
+                random_date(rng),
+                description(rng, rng.choice(subjects), 2),
+                "",
+                "",
+            ]
+        )
+
+    for _ in range(rng.randint(0, 3)):
+        completion = random_date(rng, 2010)
+        will_expire = rng.random() < 0.3
+        rows["user_certifications"].append(
+            [
+                len(rows["user_certifications"]) + 1,
+                account_id,
+                f"Certificate in {rng.choice(subjects)} Teaching",
+                rng.choice(ORGANISATIONS),
+                will_expire,
+                completion,
+                completion + timedelta(days=3 * 365) if will_expire else None,
+                rng.choice(list(MODE_OF_LEARNING)),
+                "",
+                rng.choice(list(STATUS)),
+            ]
+        )
+
+    experience = rng.randint(0, 25 * 365)
+    rows["user_computed_fields"].append([account_id, experience])
+
+    for interest in rng.sample(INTERESTS, rng.randint(0, 3)):
+        rows["user_interests"].append([account_id, interest])
+
+    for language in rng.sample(GRAVITY["languages"], rng.randint(1, 3)):
+        rows["user_languages"].append(
+            [
+                account_id,
+                gravity_uuid("languages", language),
+                rng.choice(list(PROFICIENCY)),
+            ]
+        )
+
+    rows["user_profiles"].append(
+        [
+            account_id,
+            random_date(rng, 1960, 2000),
+            rng.choice(list(GENDER)),
+            gravity_uuid("countries", rng.choice(GRAVITY["countries"])),
+            gravity_uuid("states", rng.choice(GRAVITY["states"])),
+            rng.random() < 0.6,
+            rng.random() < 0.8,
+            rng.choice(["", f"Become a Head of {subjects[0]}", "Teach abroad"]),
+        ]
+    )
+
+    for _ in range(rng.choice([0, 0, 1, 2])):
+        start = random_date(rng, 2010)
+        rows["user_projects"].append(
+            [
+                account_id,
+                f"{rng.choice(subjects)} {rng.choice(['Lab', 'Club', 'Olympiad'])}",
+                rng.random() < 0.3,
+                start,
+                start + timedelta(days=rng.randint(30, 700)),
+                "",
+                description(rng, rng.choice(subjects), 2),
+            ]
+        )
+
+    for _ in range(rng.choice([0, 0, 0, 0, 1])):
+        rows["user_publications"].append(
+            [
+                account_id,
+                f"Teaching {rng.choice(subjects)} in the Classroom",
+                rng.choice(ORGANISATIONS),
+                random_date(rng, 2005),
+                "",
+                description(rng, rng.choice(subjects), 2),
+            ]
+        )
+
+    for _ in range(rng.randint(1, 3)):
+        start = random_date(rng, 1985, 2020)
+        rows["user_qualifications"].append(
+            [
+                len(rows["user_qualifications"]) + 1,
+                account_id,
+                rng.choice(ORGANISATIONS),
+                rng.choice(DEGREES),
+                gravity_uuid(
+                    "qualification_fields", rng.choice(GRAVITY["qualification_fields"])
+                ),
+                start,
+                start + timedelta(days=rng.choice([365, 730, 1095, 1460])),
+                rng.choice(["", "A", "B+", "First Class", "8.2 CGPA"]),
+                rng.choice(list(MODE_OF_LEARNING)),
+                "",
+                rng.choice(list(STATUS)),
+                gravity_uuid(
+                    "qualification_levels", rng.choice(GRAVITY["qualification_levels"])
+                ),
+            ]
+        )
+
+    for sequence, skill in enumerate(rng.sample(SKILLS, rng.randint(2, 6))):
+        rows["user_skills"].append([account_id, skill, sequence + 1])
+
+    for subject in subjects:
+        rows["user_subject_experiences"].append(
+            [account_id, gravity_uuid("subjects", subject), rng.randint(0, experience)]
+        )
+    for sequence, subject in enumerate(rng.sample(GRAVITY["subjects"], 2)):
+        rows["user_subject_interests"].append(
+            [account_id, gravity_uuid("subjects", subject), sequence + 1]
+        )
+
+    for test in rng.sample(TESTS, rng.choice([0, 0, 1, 2])):
+        rows["user_test_scores"].append(
+            [
+                account_id,
+                test,
+                str(rng.randint(60, 120)),
+                random_date(rng, 2010),
+                "",
+                rng.choice([None, "evidence.pdf"]),
+                None,
+            ]
+        )
+
+    for _ in range(rng.randint(0, 4)):
+        start = random_date(rng, 2000)
+        currently_working = rng.random() < 0.3
+        experience_id = (account_id << 3) | len(rows["user_work_experiences"])
+        work_subjects = rng.sample(subjects, rng.randint(1, len(subjects)))
+        rows["user_work_experiences"].append(
+            [
+                experience_id,
+                account_id,
+                f"{rng.choice(GRAVITY['teaching_levels'])} {work_subjects[0]} Teacher",
+                rng.choice(list(EMPLOYMENT_TYPE)),
+                description(rng, work_subjects[0], 4),
+                rng.choice(ORGANISATIONS),
+                rng.choice([1, 1, 1, 2, 3, None]),
+                "",
+                gravity_uuid("countries", rng.choice(GRAVITY["countries"])),
+                gravity_uuid("states", rng.choice(GRAVITY["states"])),
+                currently_working,
+                start,
+                None if currently_working else start + timedelta(days=365),
+                str(rng.randrange(20000, 200000, 1000)),
+                gravity_uuid("currencies", rng.choice(GRAVITY["currencies"])),
+                gravity_uuid("curriculum", rng.choice(GRAVITY["curriculum"])),
+                gravity_uuid("teaching_levels", rng.choice(GRAVITY["teaching_levels"])),
+                gravity_uuid("teaching_roles", rng.choice(GRAVITY["teaching_roles"])),
+            ]
+        )
+        for subject in work_subjects:
+            rows["work_experience_subjects"].append(
+                [experience_id, gravity_uuid("subjects", subject)]
+            )
+
+    # Evidence rows reference the generated certifications and qualifications
+    for certification in rows["user_certifications"]:
+        certification[0] = (account_id << 3) | certification[0]
+        if rng.random() < 0.5:
+            rows["user_certification_evidences"].append([certification[0]])
+    for qualification in rows["user_qualifications"]:
+        qualification[0] = (account_id << 3) | qualification[0]
+        if rng.random() < 0.5:
+            rows["user_qualification_evidences"].append([qualification[0]])
+    return rows
+
+
+GRAVITY_NAMES = {
+    gravity_uuid(table, name): name
+    for table, names in GRAVITY.items()
+    for name in names
+}
+
+
+def to_document(rows):
+    # Mirrors the column order, enum mapping and gravity name resolution of the
+    # extraction functions in user_data_retrieval_script.py.
+    name = GRAVITY_NAMES.get
+    certification_evidences = {row[0] for row in rows["user_certification_evidences"]}
+    qualification_evidences = {row[0] for row in rows["user_qualification_evidences"]}
+    work_subjects = {}
+    for experience_id, subject_id in rows["work_experience_subjects"]:
+        work_subjects.setdefault(experience_id, []).append(subject_id)
+
+    work_experiences = []
+    for row in rows["user_work_experiences"]:
+        for subject_id in work_subjects.get(row[0], [None]):
+            work_experiences.append(
+                {
+                    "title": row[2],
+                    "employment_type": EMPLOYMENT_TYPE[row[3]],
+                    "description": row[4],
+                    "organisation_name": row[5],
+                    "organisation_type": ORGANISATION_TYPE.get(row[6], "OTHERS"),
+                    "other_organisation_type": row[7],
+                    "currently_working": row[10],
+                    "start_date": format_date(row[11]),
+                    "end_date": format_date(row[12]),
+                    "salary": row[13],
+                    "country": name(row[8], ""),
+                    "state": name(row[9], ""),
+                    "currency": name(row[14], ""),
+                    "curriculum": name(row[15], ""),
+                    "teaching_level": name(row[16], ""),
+                    "teaching_role": name(row[17], ""),
+                    "subject": name(subject_id, ""),
+                }
+            )
+
+    return {
+        "user_id": rows["users"][0][1],
+        "preferred_work_locations": [
+            {"sequence": row[3], "country": name(row[1]), "state": name(row[2])}
+            for row in rows["preferred_work_locations"]
+        ],
+        "user_awards": [
+            {
+                "title": row[1],
+                "issuer": row[2],
+                "issued_on": format_date(row[3]),
+                "description": row[4],
+                "certificate": row[5],
+                "certificate_name": row[6],
+            }
+            for row in rows["user_awards"]
+        ],
+        "user_certifications": [
+            {
+                "name": row[2],
+                "organisation_name": row[3],
+                "will_expire": row[4],
+                "completion_date": format_date(row[5]),
+                "expiration_date": format_date(row[6]),
+                "mode_of_learning": MODE_OF_LEARNING[row[7]],
+                "suraasa_certification_id": row[8],
+                "status": STATUS[row[9]],
+                "have_evidences": row[0] in certification_evidences,
+            }
+            for row in rows["user_certifications"]
+        ],
+        "user_computed_fields": [
+            {"days_of_experience": row[1]} for row in rows["user_computed_fields"]
+        ],
+        "user_interests": [{"interest": row[1]} for row in rows["user_interests"]],
+        "user_languages": [
+            {"proficiency": PROFICIENCY[row[2]], "language": name(row[1])}
+            for row in rows["user_languages"]
+        ],
+        "user_profiles": [
+            {
+                "date_of_birth": format_date(row[1]),
+                "gender": GENDER[row[2]],
+                "is_verified": row[5],
+                "looking_for_jobs": row[6],
+                "career_aspiration": row[7],
+                "country": name(row[3]),
+                "state": name(row[4]),
+            }
+            for row in rows["user_profiles"]
+        ],
+        "user_projects": [
+            {
+                "title": row[1],
+                "currently_working": row[2],
+                "start_date": format_date(row[3]),
+                "end_date": format_date(row[4]),
+                "url": row[5],
+                "description": row[6],
+            }
+            for row in rows["user_projects"]
+        ],
+        "user_publications": [
+            {
+                "title": row[1],
+                "publisher": row[2],
+                "published_on": format_date(row[3]),
+                "url": row[4],
+                "description": row[5],
+            }
+            for row in rows["user_publications"]
+        ],
+        "user_qualifications": [
+            {
+                "organisation_name": row[2],
+                "name": row[3],
+                "start_date": format_date(row[5]),
+                "end_date": format_date(row[6]),
+                "grade": row[7],
+                "mode_of_learning": MODE_OF_LEARNING[row[8]],
+                "suraasa_qualification_id": row[9],
+                "status": STATUS[row[10]],
+                "have_evidences": row[0] in qualification_evidences,
+                "qualification_field": name(row[4]),
+                "qualification_level": name(row[11]),
+            }
+            for row in rows["user_qualifications"]
+        ],
+        "user_skills": [
+            {"skill_name": row[1], "sequence": row[2]} for row in rows["user_skills"]
+        ],
+        "user_subject_experiences": [
+            {"days_of_experience": row[2], "subject": name(row[1])}
+            for row in rows["user_subject_experiences"]
+        ],
+        "user_subject_interests": [
+            {"sequence": row[2], "subject": name(row[1])}
+            for row in rows["user_subject_interests"]
+        ],
+        "user_test_scores": [
+            {
+                "name": row[1],
+                "score": row[2],
+                "test_date": format_date(row[3]),
+                "description": row[4],
+                "has_evidence": row[5] is not None or row[6] is not None,
+            }
+            for row in rows["user_test_scores"]
+        ],
+        "user_work_experiences": work_experiences,
+    }
+
+
+def generate_documents(count, seed=SYNTHETIC_SEED, start=0):
+    for index in range(start, start + count):
+        yield to_document(generate_user(seed, index))
+
+
+def write_documents(path, count, seed=SYNTHETIC_SEED):
+    # Documents are streamed into the same JSON array format as data.json, so
+    # millions of users never have to be held in memory.
+    with open(path, "w") as file:
+        file.write("[")
+        for i, document in enumerate(generate_documents(count, seed)):
+            file.write(("," if i else "") + json.dumps(document))
+        file.write("]")
+
+
+def create_tables(solis_cur, gravity_cur):
+    for table, columns in SOLIS_TABLES.items():
+        solis_cur.execute(f"drop table if exists {table}")
+        solis_cur.execute(f"create table {table} ({columns})")
+    for table in GRAVITY:
+        gravity_cur.execute(f"drop table if exists {table}")
+        gravity_cur.execute(
+            f"create table {table} (uuid uuid, name text, date_deleted timestamp)"
+        )
+
+
+def copy_rows(cur, table, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+    buffer.seek(0)
+    cur.copy_expert(
+        f"copy {table} ({', '.join(columns)}) from stdin with (format csv)", buffer
+    )
+
+
+def column_names(columns):
+    # deleted_at is never generated and is left NULL
+    return [
+        column.split()[0]
+        for column in columns.split(", ")
+        if not column.startswith("deleted_at")
+    ]
+
+
+def database_key(config):
+    return (
+        config.get("host", "localhost"),
+        str(config.get("port", 5432)),
+        config.get("dbname", config.get("database")),
+    )
+
+
+def seed_databases():
+    # Seeding drops and recreates the Solis and Gravity tables, so it only runs
+    # against the LOAD_TEST_*_DATABASE settings and refuses any database the
+    # extractor reads from.
+    from src import configuration
+
+    solis = getattr(configuration, "LOAD_TEST_SOLIS_DATABASE", None)
+    gravity = getattr(configuration, "LOAD_TEST_GRAVITY_DATABASE", None)
+    if not solis or not gravity:
+        raise ValueError(
+            "LOAD_TEST_SOLIS_DATABASE and LOAD_TEST_GRAVITY_DATABASE must be "
+            "configured to seed Postgres"
+        )
+    production = {
+        database_key(config)
+        for config in (
+            getattr(configuration, "SOLIS_DATABASE", None),
+            getattr(configuration, "SOLIS_REPLICA_DATABASE", None),
+            getattr(configuration, "GRAVITY_DATABASE", None),
+            getattr(configuration, "GRAVITY_REPLICA_DATABASE", None),
+        )
+        if config
+    }
+    for name, config in [("solis", solis), ("gravity", gravity)]:
+        if database_key(config) in production:
+            raise ValueError(
+                f"The load test {name} database is a Solis or Gravity database "
+                "used by the extractor, refusing to seed it"
+            )
+    return Database("load-test-solis", solis), Database("load-test-gravity", gravity)
+
+
+def seed_postgres(solis_conn, gravity_conn, count, seed=SYNTHETIC_SEED):
+    solis_cur = solis_conn.cursor()
+    gravity_cur = gravity_conn.cursor()
+    create_tables(solis_cur, gravity_cur)
+    for table, names in GRAVITY.items():
+        copy_rows(
+            gravity_cur,
+            table,
+            ["uuid", "name"],
+            [[gravity_uuid(table, name), name] for name in names],
+        )
+    gravity_conn.commit()
+
+    for start in range(0, count, SYNTHETIC_CHUNK_SIZE):
+        chunk = {table: [] for table in SOLIS_TABLES}
+        for index in range(start, min(start + SYNTHETIC_CHUNK_SIZE, count)):
+            for table, rows in generate_user(seed, index).items():
+                chunk[table].extend(rows)
+        chunk["users"] = [[id, user_uuid, True] for id, user_uuid in chunk["users"]]
+        for table, rows in chunk.items():
+            copy_rows(solis_cur, table, column_names(SOLIS_TABLES[table]), rows)
+        solis_conn.commit()
+        print(min(start + SYNTHETIC_CHUNK_SIZE, count))
+
+
+def main():
+    write_documents(SYNTHETIC_OUTPUT, SYNTHETIC_USERS)
+
+    if SYNTHETIC_SEED_POSTGRES:
+        solis_db, gravity_db = seed_databases()
+        with solis_db.connection(read_only=False) as solis_conn, gravity_db.connection(
+            read_only=False
+        ) as gravity_conn:
+            seed_postgres(solis_conn, gravity_conn, SYNTHETIC_USERS)
+        solis_db.close()
+        gravity_db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,18 +8,36 @@ import pandas as pd
 
 warnings.simplefilter(action="ignore", category=DeprecationWarning)
 warnings.simplefilter(action="ignore", category=FutureWarning)
-import psycopg2
 
 # Add the src directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 
-from src.configuration import GRAVITY_DATABASE, SOLIS_DATABASE
-
-solis_conn = psycopg2.connect(**SOLIS_DATABASE)
-solis_cur = solis_conn.cursor()
-gravity_conn = psycopg2.connect(**GRAVITY_DATABASE)
-gravity_cur = gravity_conn.cursor()
+from src import configuration
+from src.code.columnar_dataset import (
+    compact_dataset,
+    publish_dataset,
+    staging_path,
+    write_section,
+)
+from src.code.db import Database
+
+# OUTPUT_FORMAT is either "json" (data.json) or "parquet", which writes every
+# profile section as a Parquet dataset partitioned by user_id under DATASET_PATH.
+OUTPUT_FORMAT = os.environ.get("OUTPUT_FORMAT", "json")
+DATASET_PATH = os.environ.get("DATASET_PATH", "data/dataset")
+
+# Reads are routed to the *_REPLICA_DATABASE settings when they are configured
+solis_db = Database(
+    "solis",
+    configuration.SOLIS_DATABASE,
+    getattr(configuration, "SOLIS_REPLICA_DATABASE", None),
+)
+gravity_db = Database(
+    "gravity",
+    configuration.GRAVITY_DATABASE,
+    getattr(configuration, "GRAVITY_REPLICA_DATABASE", None),
+)
 
 
 def get_gravity_value(df, gravity_columns):
@@ -36,9 +54,8 @@ def get_gravity_value(df, gravity_columns):
             where
                 date_deleted is null;
         """
-        gravity_cur.execute(query)
         gravity_df = pd.DataFrame(
-            gravity_cur.fetchall(),
+            gravity_db.fetchall(query),
             columns=["uuid", field.split("_id")[0]],
         )
         df = pd.merge(
@@ -52,15 +69,16 @@ def get_gravity_value(df, gravity_columns):
     return df
 
 
-def get_data(query, columns, gravity_columns={}):
-    solis_cur.execute(query)
+def get_data(query, columns, gravity_columns={}, as_frame=False):
     df = pd.DataFrame(
-        solis_cur.fetchall(),
+        solis_db.fetchall(query),
         columns=columns,
     )
     if gravity_columns:
         df = get_gravity_value(df, gravity_columns)
     df.fillna("", inplace=True)
+    if as_frame:
+        return df
     grouped_data = (
         df.groupby("user_id")
         .apply(
@@ -104,11 +122,10 @@ def get_users(user_ids=None):
                 and u.deleted_at is null
                 and la.deleted_at is null limit 1000;
             """
-    solis_cur.execute(query)
-    return {val[0]: val[1] for val in solis_cur.fetchall()}
+    return {val[0]: val[1] for val in solis_db.fetchall(query)}
 
 
-def get_preferred_work_locations(user_ids: List[int]):
+def get_preferred_work_locations(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -129,10 +146,10 @@ def get_preferred_work_locations(user_ids: List[int]):
     ]
     gravity_columns = {"countries": "country_id", "states": "state_id"}
 
-    return get_data(query, columns, gravity_columns)
+    return get_data(query, columns, gravity_columns, as_frame)
 
 
-def get_user_awards(user_ids: List[int]):
+def get_user_awards(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -158,10 +175,10 @@ def get_user_awards(user_ids: List[int]):
         "certificate",
         "certificate_name",
     ]
-    return get_data(query, columns)
+    return get_data(query, columns, as_frame=as_frame)
 
 
-def get_user_certifications(user_ids: List[int]):
+def get_user_certifications(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -213,10 +230,10 @@ def get_user_certifications(user_ids: List[int]):
         "status",
         "have_evidences",
     ]
-    return get_data(query, columns)
+    return get_data(query, columns, as_frame=as_frame)
 
 
-def get_user_computed_fields(user_ids: List[int]):
+def get_user_computed_fields(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 days_of_experience,
@@ -232,10 +249,10 @@ def get_user_computed_fields(user_ids: List[int]):
         "days_of_experience",
         "user_id",
     ]
-    return get_data(query, columns)
+    return get_data(query, columns, as_frame=as_frame)
 
 
-def get_user_interests(user_ids: List[int]):
+def get_user_interests(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -251,10 +268,10 @@ def get_user_interests(user_ids: List[int]):
         "user_id",
         "interest",
     ]
-    return get_data(query, columns)
+    return get_data(query, columns, as_frame=as_frame)
 
 
-def get_user_languages(user_ids: List[int]):
+def get_user_languages(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -279,10 +296,10 @@ def get_user_languages(user_ids: List[int]):
         "proficiency",
     ]
     gravity_columns = {"languages": "language_id"}
-    return get_data(query, columns, gravity_columns)
+    return get_data(query, columns, gravity_columns, as_frame)
 
 
-def get_user_profiles(user_ids: List[int]):
+def get_user_profiles(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -315,10 +332,10 @@ def get_user_profiles(user_ids: List[int]):
         "career_aspiration",
     ]
     gravity_columns = {"countries": "country_id", "states": "state_id"}
-    return get_data(query, columns, gravity_columns)
+    return get_data(query, columns, gravity_columns, as_frame)
 
 
-def get_user_projects(user_ids: List[int]):
+def get_user_projects(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -344,10 +361,10 @@ def get_user_projects(user_ids: List[int]):
         "url",
         "description",
     ]
-    return get_data(query, columns)
+    return get_data(query, columns, as_frame=as_frame)
 
 
-def get_user_publications(user_ids: List[int]):
+def get_user_publications(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -371,10 +388,10 @@ def get_user_publications(user_ids: List[int]):
         "url",
         "description",
     ]
-    return get_data(query, columns)
+    return get_data(query, columns, as_frame=as_frame)
 
 
-def get_user_qualifications(user_ids: List[int]):
+def get_user_qualifications(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -434,10 +451,10 @@ def get_user_qualifications(user_ids: List[int]):
         "qualification_fields": "qualification_field_id",
         "qualification_levels": "qualification_level_id",
     }
-    return get_data(query, columns, gravity_columns)
+    return get_data(query, columns, gravity_columns, as_frame)
 
 
-def get_user_skills(user_ids: List[int]):
+def get_user_skills(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_account_id,
@@ -455,10 +472,10 @@ def get_user_skills(user_ids: List[int]):
         "skill_name",
         "sequence",
     ]
-    return get_data(query, columns)
+    return get_data(query, columns, as_frame=as_frame)
 
 
-def get_user_subject_experiences(user_ids: List[int]):
+def get_user_subject_experiences(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -477,10 +494,10 @@ def get_user_subject_experiences(user_ids: List[int]):
         "days_of_experience",
     ]
     gravity_columns = {"subjects": "subject_id"}
-    return get_data(query, columns, gravity_columns)
+    return get_data(query, columns, gravity_columns, as_frame)
 
 
-def get_user_subject_interests(user_ids: List[int]):
+def get_user_subject_interests(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -499,10 +516,10 @@ def get_user_subject_interests(user_ids: List[int]):
         "sequence",
     ]
     gravity_columns = {"subjects": "subject_id"}
-    return get_data(query, columns, gravity_columns)
+    return get_data(query, columns, gravity_columns, as_frame)
 
 
-def get_user_test_scores(user_ids: List[int]):
+def get_user_test_scores(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -530,10 +547,10 @@ def get_user_test_scores(user_ids: List[int]):
         "description",
         "has_evidence",
     ]
-    return get_data(query, columns)
+    return get_data(query, columns, as_frame=as_frame)
 
 
-def get_user_work_experiences(user_ids: List[int]):
+def get_user_work_experiences(user_ids: List[int], as_frame=False):
     query = f"""
             select
                 learning_user_id,
@@ -605,7 +622,35 @@ def get_user_work_experiences(user_ids: List[int]):
         "teaching_roles": "teaching_role_id",
         "subjects": "subject_id",
     }
-    return get_data(query, columns, gravity_columns)
+    return get_data(query, columns, gravity_columns, as_frame)
+
+
+SECTIONS = {
+    "preferred_work_locations": get_preferred_work_locations,
+    "user_awards": get_user_awards,
+    "user_certifications": get_user_certifications,
+    "user_computed_fields": get_user_computed_fields,
+    "user_interests": get_user_interests,
+    "user_languages": get_user_languages,
+    "user_profiles": get_user_profiles,
+    "user_projects": get_user_projects,
+    "user_publications": get_user_publications,
+    "user_qualifications": get_user_qualifications,
+    "user_skills": get_user_skills,
+    "user_subject_experiences": get_user_subject_experiences,
+    "user_subject_interests": get_user_subject_interests,
+    "user_test_scores": get_user_test_scores,
+    "user_work_experiences": get_user_work_experiences,
+}
+
+
+def write_dataset(root, user_ids, user_id_dict):
+    users = pd.DataFrame(
+        {"user_id": user_ids, "uuid": [user_id_dict[user_id] for user_id in user_ids]}
+    )
+    write_section(users, root, "users")
+    for section, get_section in SECTIONS.items():
+        write_section(get_section(user_ids, as_frame=True), root, section)
 
 
 def chunking(data, size):
@@ -617,7 +662,13 @@ def chunking(data, size):
 def main():
     user_uuid_df = pd.read_csv(r"D:\Workspace\vector-search\src\data\user_uuids.csv")
     user_id_dict = get_users(user_uuid_df["user_uuid"].to_list())
+    if OUTPUT_FORMAT == "parquet":
+        staging = staging_path(DATASET_PATH)
     for user_ids in chunking(list(user_id_dict.keys()), 1000):
+        if OUTPUT_FORMAT == "parquet":
+            write_dataset(staging, user_ids, user_id_dict)
+            continue
+
         preferred_work_locations = get_preferred_work_locations(user_ids)
         user_awards = get_user_awards(user_ids)
         user_certifications = get_user_certifications(user_ids)
@@ -662,6 +713,11 @@ def main():
         with open(r"D:\Workspace\vector-search\src\data\data.json", "w") as file:
             file.write(json.dumps(data))
 
+    if OUTPUT_FORMAT == "parquet":
+        compact_dataset(staging)
+        publish_dataset(staging, DATASET_PATH)
+    print(json.dumps({"solis": solis_db.metrics, "gravity": gravity_db.metrics}))
+
 
 if __name__ == "__main__":
     main()